@@ -0,0 +1,127 @@
+"""End-to-end broadcast benchmark against the offline mock client.
+
+    python bench_broadcast.py [--sizes 100 1000 10000] [--concurrency 20] [--flood-rate 0.001] ...
+
+For each size, one account syncs its dialogs from a MockTelegramClient and a
+BroadcastEngine runs one pass, stopping once every group has been attempted.
+Reports sends/s, p50/p99 send latency (rate-governor wait included), CPU time
+per attempt (scheduler and engine bookkeeping; the mock's simulated latency
+costs no CPU) and the peak Python memory of a second, traced pass.
+"""
+import argparse
+import collections
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# The run writes sessions/, its log files and metrics.db to the working
+# directory; keep the benchmark's out of the repo.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="broadcast-bench-"))
+
+import core  # noqa: E402
+from mock_telegram import MockTelegramClient  # noqa: E402
+
+MESSAGE = "{Hello|Hi|Hey} %group%, {check this out|have a look}!"
+
+
+async def run_pass(loop_thread, size, args, traced=False):
+    manager = core.TelegramManager(loop_thread, lambda msg: None, client_factory=MockTelegramClient.factory(
+        groups=size, latency=(args.min_latency, args.max_latency), slowmode_ratio=args.slowmode_ratio,
+        flood_rate=args.flood_rate, flood_seconds=args.flood_seconds, drop_rate=args.drop_rate, seed=size))
+    manager.governor = core.RateGovernor(max_rate=args.rate or 1e9)
+    manager._create_client(f"bench-{size}")
+    await manager.client.connect()
+    if traced:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    sync_start = time.perf_counter()
+    groups = await manager._get_groups(full=True)
+    sync_time = time.perf_counter() - sync_start
+
+    engine = None
+    attempted, latencies, outcomes = set(), [], collections.Counter()
+    send = manager.send_message_async
+
+    async def timed_send(gid, message, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await send(gid, message, **kwargs)
+            outcomes["sent"] += 1
+            return result
+        except Exception as e:
+            outcomes[type(e).__name__] += 1
+            raise
+        finally:
+            latencies.append(time.perf_counter() - start)
+            attempted.add(gid)
+            if len(attempted) == len(groups):
+                engine.stop()
+
+    manager.send_message_async = timed_send
+    engine = core.BroadcastEngine({manager: groups}, MESSAGE, interval=3600, duration_min=60,
+                                  concurrency=args.concurrency, spintax=True, log_callback=lambda msg: None)
+    cpu_start, start = time.process_time(), time.perf_counter()
+    await engine.run()
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+    result = {
+        "groups": len(groups), "sync_s": sync_time, "elapsed_s": elapsed, "outcomes": outcomes,
+        "rate": outcomes["sent"] / elapsed, "cpu_us": cpu / max(1, len(latencies)) * 1e6,
+        "p50_ms": percentile(latencies, 50) * 1000, "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    if traced:
+        result["peak_mib"] = (tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20
+    return result
+
+
+def percentile(values, pct):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[pct - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=0, help="governor cap in msg/s (0: uncapped)")
+    parser.add_argument("--min-latency", type=float, default=0.02)
+    parser.add_argument("--max-latency", type=float, default=0.08)
+    parser.add_argument("--slowmode-ratio", type=float, default=0.2)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--flood-seconds", type=int, default=2)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced second pass")
+    args = parser.parse_args()
+
+    # Keep the per-send log records (they are part of the send path) but off the console.
+    for handler in core.setup_logging().handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setLevel(logging.CRITICAL)
+
+    loop_thread = core.AsyncLoopThread()
+    loop_thread.start()
+    print(f"{'groups':>7} {'sync s':>7} {'pass s':>7} {'sent':>6} {'slow':>5} {'flood':>5} {'t/o':>4} "
+          f"{'msg/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'cpu us':>7} {'peak MiB':>8}")
+    for size in args.sizes:
+        r = loop_thread.run_coroutine(run_pass(loop_thread, size, args)).result()
+        peak = "-"
+        if not args.no_memory:
+            tracemalloc.start()
+            traced = loop_thread.run_coroutine(run_pass(loop_thread, size, args, traced=True)).result()
+            tracemalloc.stop()
+            peak = f"{traced['peak_mib']:.1f}"
+        o = r["outcomes"]
+        print(f"{r['groups']:>7} {r['sync_s']:>7.2f} {r['elapsed_s']:>7.2f} {o['sent']:>6} "
+              f"{o['SlowModeWaitError']:>5} {o['FloodWaitError']:>5} {o['TimeoutError']:>4} "
+              f"{r['rate']:>8.1f} {r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} {r['cpu_us']:>7.0f} {peak:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Import-time budget for the GUI startup path.
+
+    python bench_startup.py [--runs 5]
+
+Imports each startup module in a fresh interpreter and reports the median
+time. Exits with status 1 if a module goes over its budget or if one of the
+deferred modules (Telethon, requests, webbrowser) is imported before the
+first window again.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Milliseconds, about 3x a local run; main includes customtkinter + Tk. The
+# Windows build workflow runs this script before building the exe.
+BUDGETS_MS = {
+    "core": 250,
+    "main": 900,
+}
+DEFERRED = ("telethon", "requests", "webbrowser")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = PROBE.format(module=module, deferred=DEFERRED)
+    samples, loaded = [], set()
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        loaded.update(result["loaded"])
+    return statistics.median(samples), sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        try:
+            ms, loaded = measure(module, args.runs)
+        except RuntimeError as e:
+            print(f"{module:<6} import failed: {e}")
+            failed = True
+            continue
+        status = "ok"
+        if ms > budget:
+            status = "OVER BUDGET"
+        if loaded:
+            status = f"imports {', '.join(loaded)} at startup"
+        failed |= status != "ok"
+        print(f"{module:<6} {ms:7.1f} ms  (budget {budget} ms)  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
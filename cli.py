@@ -0,0 +1,281 @@
+"""Headless broadcaster: runs broadcasts from the command line without Tk.
+
+Uses the same session files, groups.json, blacklist.json and settings.json as
+the desktop app, so an account logged in from either side works in both.
+
+    python cli.py login --phone +15551234567
+    python cli.py groups [--full]
+    python cli.py run --message "Hello {there|all}" --targets all --interval 60 --duration 30
+    python cli.py run --message "New menu" --targets=-1001234,-1005678 --attach menu.pdf
+    python cli.py run --message "Summer drop" --targets all --attach 1.jpg 2.jpg 3.jpg
+    python cli.py run --job job.json
+    python cli.py resume [--job-id N]
+
+A job file is a JSON object with any of the `run` options as keys: message,
+targets (a list of group ids, or "all" for every group), interval, duration,
+parallel, spintax, safe_mode and media (a list of file paths; several files
+are sent as one album). Command-line options override the job file. Targets
+have no default: like the app, a run only sends to groups picked for it. Every
+run is recorded in jobs.db, so `resume` continues a run that was killed or
+crashed without resending to the groups it had already served.
+"""
+import argparse
+import getpass
+import json
+import os
+import signal
+import sys
+import time
+
+from core import (
+    SETTINGS_FILE, BROADCAST_CONCURRENCY, SPINTAX_VARIANTS, SPINTAX_REPEAT_WINDOW,
+    AsyncLoopThread, TelegramManager, ManagerPool, BroadcastEngine, JobStore, storage, log_line, setup_logging,
+    attachment_error, format_duration,
+)
+
+SAFE_MODE_MIN_INTERVAL = 60    # same floor as the Safe Mode switch in the app
+STATS_LOG_EVERY = 60           # seconds between two live throughput lines
+
+JOB_DEFAULTS = {
+    "message": None,
+    "targets": None,
+    "interval": 60,
+    "duration": 60,
+    "parallel": BROADCAST_CONCURRENCY,
+    "spintax": False,
+    "safe_mode": True,
+    "media": [],
+}
+
+
+def load_settings():
+    return storage.get(SETTINGS_FILE, {})
+
+
+def connect(phone):
+    """Starts the async loop and connects the account's session file."""
+    loop_thread = AsyncLoopThread()
+    loop_thread.start()
+    manager = TelegramManager(loop_thread, log_line)
+    manager.connect(phone).result()
+    return loop_thread, manager
+
+
+def open_pool(phone):
+    loop_thread, manager = connect(phone)
+    if not manager.is_user_authorized().result():
+        raise SystemExit(f"Session '{manager.session_name}' is not logged in; run `cli.py login` first.")
+    return ManagerPool(loop_thread, log_line, manager)
+
+
+def fetch_groups(pool, full=False):
+    groups = pool.get_dialogs(full).result()
+    try:
+        pool.save_groups(groups)
+    except Exception as e:
+        log_line(f"Failed to save groups.json: {e}")
+    return groups
+
+
+# ── Commands ──────────────────────────────────────────────────────────────────
+def cmd_login(args, settings):
+    from telethon import errors
+    phone = args.phone or settings.get("last_phone")
+    if not phone:
+        raise SystemExit("No phone number given.")
+    _, manager = connect(phone)
+    if manager.is_user_authorized().result():
+        log_line(f"Already logged in as {phone}.")
+        return 0
+
+    manager.send_code_request(phone).result()
+    code = input("Code: ").strip()
+    try:
+        manager.sign_in(code).result()
+    except errors.SessionPasswordNeededError:
+        manager.sign_in(code, getpass.getpass("2FA password: ")).result()
+    log_line(f"Logged in as {phone}.")
+
+    settings["last_phone"] = phone
+    storage.put(SETTINGS_FILE, settings)
+    return 0
+
+
+def cmd_groups(args, settings):
+    pool = open_pool(args.phone or settings.get("last_phone"))
+    groups = fetch_groups(pool, args.full)
+    for grp in sorted(groups, key=lambda g: g['title'].lower()):
+        flags = " [blacklisted]" if grp.get('is_blacklisted') else ""
+        slowmode = f" slowmode={grp['slowmode']}s" if grp.get('slowmode') else ""
+        print(f"{grp['id']}\t{grp['title']}{slowmode}{flags}")
+    return 0
+
+
+def load_job(args):
+    job = dict(JOB_DEFAULTS)
+    if args.job:
+        with open(args.job, "r", encoding="utf-8") as f:
+            job.update(json.load(f))
+    for key in JOB_DEFAULTS:
+        value = getattr(args, key, None)
+        if value is not None:
+            job[key] = value
+    if args.message_file:
+        with open(args.message_file, "r", encoding="utf-8") as f:
+            job["message"] = f.read()
+    if args.attach:
+        job["media"] = args.attach
+    if job["targets"] is None:
+        raise SystemExit('Error: No targets given; pass --targets with group ids (see `cli.py groups`) '
+                         'or "all" to send to every group.')
+    if isinstance(job["targets"], str) and job["targets"] != "all":
+        job["targets"] = [int(t) for t in job["targets"].split(",") if t.strip()]
+    return job
+
+
+def select_targets(groups, wanted):
+    """Non-blacklisted groups matching `wanted` ("all" or a list of ids)."""
+    by_id = {g['id']: g for g in groups}
+    if wanted == "all":
+        ids = list(by_id)
+    else:
+        ids = [int(gid) for gid in wanted]
+        for gid in ids:
+            if gid not in by_id:
+                log_line(f"Skipping {gid}: not a sendable group of any logged-in account.")
+    return [by_id[gid] for gid in ids if gid in by_id and not by_id[gid].get('is_blacklisted')]
+
+
+def cmd_run(args, settings):
+    job = load_job(args)
+    message = (job["message"] or "").strip()
+    if not message:
+        raise SystemExit("Error: Message is empty.")
+    media = [os.path.abspath(path) for path in job["media"]]
+    error = attachment_error(media, message)
+    if error:
+        raise SystemExit(f"Error: {error}")
+
+    pool = open_pool(args.phone or settings.get("last_phone"))
+    targets = select_targets(fetch_groups(pool), job["targets"])
+    if not targets:
+        raise SystemExit("Error: No groups selected.")
+
+    interval = int(job["interval"])
+    if job["safe_mode"]:
+        interval = max(interval, SAFE_MODE_MIN_INTERVAL)
+        log_line(f"Safe Mode ON: effective interval = {interval}s")
+
+    store = JobStore()
+    job_id = store.create_job(message, interval, int(job["duration"]), int(job["parallel"]),
+                              bool(job["spintax"]), targets, media)
+    log_line(f"Job {job_id} created.")
+    return run_job(pool, store, store.job(job_id), targets, settings)
+
+
+def cmd_resume(args, settings):
+    store = JobStore()
+    job = store.job(args.job_id) if args.job_id else store.interrupted()
+    if job is None or job['status'] != "running" or job['ends_at'] <= time.time():
+        raise SystemExit("No interrupted job to resume.")
+    pool = open_pool(args.phone or settings.get("last_phone"))
+    targets = store.targets(job['id'], fetch_groups(pool))
+    log_line(f"Resuming job {job['id']}.")
+    return run_job(pool, store, job, targets, settings)
+
+
+def log_stats(stats):
+    line = (f"Last minute: {stats['sent_1m']} sent, {stats['failed_1m']} failed, "
+            f"{stats['slowmode_1m']} slowmode, {stats['flood_wait_1m']} FloodWait · "
+            f"{stats['in_flight']} in flight · pass {stats['pass_number']}: {stats['pass_left']} left")
+    if stats['pass_eta_s'] is not None:
+        line += f" (ETA {format_duration(stats['pass_eta_s'])})"
+    log_line(line)
+
+
+def run_job(pool, store, job, targets, settings):
+    shards = pool.shard(targets)
+    next_stats = time.monotonic() + STATS_LOG_EVERY
+
+    def _on_stats(stats):
+        nonlocal next_stats
+        if time.monotonic() >= next_stats:
+            next_stats += STATS_LOG_EVERY
+            log_stats(stats)
+
+    engine = BroadcastEngine(
+        shards, job['message'], job['interval'], (job['ends_at'] - time.time()) / 60,
+        concurrency=job['concurrency'], spintax=bool(job['spintax']),
+        spintax_variants=settings.get("spintax_variants", SPINTAX_VARIANTS),
+        spintax_window=settings.get("spintax_window", SPINTAX_REPEAT_WINDOW),
+        log_callback=log_line, stats_callback=_on_stats, store=store, job_id=job['id'], media=job['media'],
+    )
+    if engine.variants:
+        log_line(f"SpinTax: {len(engine.variants.variants)} unique variants ready.")
+
+    def _stop(signum, frame):
+        # Ctrl+C ends the job; SIGTERM (service stop, shutdown) leaves it resumable.
+        log_line("Stopping broadcast…")
+        engine.stop(resumable=signum == signal.SIGTERM)
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    log_line(f"Starting broadcast to {len(targets)} groups…")
+    if len(shards) > 1:
+        log_line("Sharded across accounts: " + ", ".join(
+            f"{m.session_name} ({len(g)})" for m, g in shards.items()))
+    future = pool.loop_thread.run_coroutine(engine.run())
+    # Waiting in short slices keeps the main thread responsive to signals.
+    while not future.done():
+        try:
+            future.result(timeout=1)
+        except TimeoutError:
+            pass
+    future.result()
+    log_line("Broadcast session ended.")
+    store.close()
+    pool.disconnect_all()
+    return 0
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--phone", help="account to use (default: last account logged in)")
+    parser = argparse.ArgumentParser(description="Broadcast to Telegram groups without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("login", parents=[common], help="log an account in and create its session file")
+
+    groups = sub.add_parser("groups", parents=[common], help="list the groups the accounts can send to")
+    groups.add_argument("--full", action="store_true", help="ignore the incremental sync state")
+
+    run = sub.add_parser("run", parents=[common], help="run one broadcast until its duration is over")
+    run.add_argument("--job", help="JSON job file")
+    run.add_argument("--message")
+    run.add_argument("--message-file")
+    run.add_argument("--attach", nargs="+", metavar="FILE",
+                     help="files to send with the message as their caption (several: one album)")
+    run.add_argument("--targets", help='comma-separated group ids, or "all" for every group (required '
+                                       'unless the job file has targets)')
+    run.add_argument("--interval", type=int, help="seconds between two sends to one group")
+    run.add_argument("--duration", type=int, help="minutes to run for")
+    run.add_argument("--parallel", type=int, help="sends kept in flight per account")
+    run.add_argument("--spintax", action="store_true", default=None)
+    run.add_argument("--no-safe-mode", dest="safe_mode", action="store_false", default=None)
+
+    resume = sub.add_parser("resume", parents=[common], help="continue an interrupted run")
+    resume.add_argument("--job-id", type=int, help="job to resume (default: the latest interrupted one)")
+    return parser
+
+
+COMMANDS = {"login": cmd_login, "groups": cmd_groups, "run": cmd_run, "resume": cmd_resume}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging()
+    return COMMANDS[args.command](args, load_settings())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1808 @@
+"""Tk-free backend shared by the desktop app (main.py) and the headless runner (cli.py)."""
+import atexit
+import os
+import sys
+import json
+import time
+import threading
+import asyncio
+import bisect
+import collections
+import functools
+import hashlib
+import heapq
+import itertools
+import math
+import mimetypes
+import queue
+import random
+import re
+import sqlite3
+import logging
+import logging.handlers
+from datetime import datetime
+from typing import List, Dict, Optional, Sequence
+
+from dotenv import load_dotenv
+
+# Telethon takes well over a second to import, so it is imported where it is
+# used; the GUI calls import_telethon() off the Tk thread while LoadingWindow shows.
+
+# --- Logging Setup ---
+# Every logging call only enqueues a record; a single listener thread does the
+# formatting-to-disk, so neither the Tk thread nor the send path touches files.
+ERROR_LOG_FILE = "error_log.txt"
+EVENT_LOG_FILE = "broadcast_log.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024    # rotate once a file reaches this size...
+LOG_ROTATE_INTERVAL = 24 * 3600    # ...or once it is this old
+LOG_BACKUP_COUNT = 5
+
+event_log = logging.getLogger("broadcaster.send")
+ui_log = logging.getLogger("broadcaster.ui")
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per line; structured `extra` fields are kept as keys."""
+    FIELDS = ("account", "group_id", "outcome", "latency_ms", "error_class", "wait_s")
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that also rolls over every `interval` seconds."""
+    def __init__(self, filename, max_bytes, interval, backup_count):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Routes logging through the queue listener; called once by each entry point.
+
+    Importing core installs no handlers and creates no files, so the library
+    can be used from tests and tools without touching the working directory.
+    """
+    error_handler = SizeTimeRotatingFileHandler(
+        ERROR_LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT)
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    event_handler = SizeTimeRotatingFileHandler(
+        EVENT_LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT)
+    event_handler.setLevel(logging.INFO)
+    event_handler.setFormatter(JsonLineFormatter())
+
+    handlers = [error_handler, event_handler]
+    if sys.stderr is not None:  # windowed builds have no console
+        console = logging.StreamHandler()
+        console.setLevel(logging.INFO)
+        console.setFormatter(logging.Formatter('[%(asctime)s]  %(message)s', '%H:%M:%S'))
+        handlers.append(console)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    logging.getLogger("telethon").setLevel(logging.WARNING)
+    return listener
+
+
+def log_line(message: str):
+    """Queues one human-readable status line; error lines also reach ERROR_LOG_FILE."""
+    lowered = message.lower()
+    level = logging.ERROR if "error" in lowered or "failed" in lowered else logging.INFO
+    ui_log.log(level, message)
+
+
+# --- Load Environment ---
+if hasattr(sys, '_MEIPASS'):
+    base_path = sys._MEIPASS
+else:
+    base_path = os.path.dirname(os.path.abspath(__file__))
+
+env_path = os.path.join(base_path, '.env')
+
+# --- Configuration (CLEAN VERSION) ---
+SESSIONS_DIR = "sessions"
+GROUPS_FILE = "groups.json"
+DRAFTS_FILE = "drafts.json"
+BLACKLIST_FILE = "blacklist.json"
+SETTINGS_FILE = "settings.json"
+JOBS_DB = "jobs.db"            # broadcast jobs and per-group progress (SQLite, WAL)
+METRICS_DB = "metrics.db"      # one row per send attempt, append-only (SQLite, WAL)
+STORE_DEBOUNCE = 0.5           # seconds a JSON document must stay unchanged before it is written
+MEDIA_CACHE_FILE = "media_cache.json"  # uploaded media per account, keyed by content hash
+
+# Media upload
+UPLOAD_PART_SIZE = 512 * 1024  # Telegram's largest upload part
+UPLOAD_WORKERS = 4             # parts in flight at once during an upload
+UPLOAD_BIG_FILE = 10 * 1024 * 1024  # larger files use the "big file" upload API
+CAPTION_MAX_LEN = 1024         # Telegram's limit for a media caption (plain messages: 4096)
+ALBUM_MAX_ITEMS = 10           # Telegram's limit for one album
+
+# Broadcast engine defaults
+BROADCAST_CONCURRENCY = 5      # sends kept in flight at once
+BROADCAST_RATE_LIMIT = 1.0     # global cap, messages per second
+SEND_TIMEOUT = 10              # seconds before a send is reported as timed out
+STATS_WINDOWS = (60, 600)      # rolling windows (seconds) of the live send counters
+STATS_INTERVAL = 1.0           # seconds between two live stats snapshots
+
+# SpinTax variant pre-generation
+SPINTAX_VARIANTS = 200         # distinct variants rendered per run
+SPINTAX_REPEAT_WINDOW = 5      # a group never gets one of its last N variants again
+
+# Rate governor (AIMD) tuning
+GOVERNOR_MIN_RATE = 0.05       # never throttle below one message per 20 s
+GOVERNOR_RATE_STEP = 0.1       # additive increase after each clean window
+GOVERNOR_CLEAN_WINDOW = 60     # seconds without FloodWait before raising the rate
+PEER_MIN_SPACING = 3.0         # seconds between two sends to the same peer
+FLOOD_RETRY_MAX = 60           # longest FloodWait the sync and upload paths wait out
+
+# Dialog sync
+SYNC_STATE_VERSION = 1
+FULL_SYNC_MAX_AGE = 24 * 3600  # a full sync older than this forces a new one
+
+
+@functools.lru_cache(maxsize=None)
+def api_credentials():
+    """(api_id, api_hash) from TG_API_ID/TG_API_HASH, after loading env_path once."""
+    load_dotenv(env_path)
+    api_id = os.getenv("TG_API_ID")
+    api_hash = os.getenv("TG_API_HASH")
+    try:
+        if api_id:
+            api_id = int(api_id)
+    except ValueError:
+        logging.error(f"Invalid TG_API_ID found: {api_id}")
+        api_id = None
+    return api_id, api_hash
+
+
+# ── Storage ───────────────────────────────────────────────────────────────────
+class DocumentStore:
+    """The app's JSON files (settings, drafts, blacklist, groups, peer caches),
+    kept in memory.
+
+    get() reads a file once and then serves it from memory, keeping the default
+    for a missing file so every caller shares one document; put() replaces the
+    document and schedules a write. A writer thread flushes each document
+    STORE_DEBOUNCE seconds after its last change with write + fsync + rename,
+    so a crash leaves the old or the new file but never a torn one.
+    """
+    def __init__(self, debounce: float = STORE_DEBOUNCE):
+        self.debounce = debounce
+        self._docs = {}
+        self._due = {}
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._writer = None
+
+    def get(self, path: str, default=None):
+        with self._cond:
+            doc = self._docs[path] if path in self._docs else self._read(path)
+            if doc is None:
+                doc = default
+            self._docs[path] = doc
+            return doc
+
+    def put(self, path: str, doc):
+        with self._cond:
+            self._docs[path] = doc
+            self._due[path] = time.monotonic() + self.debounce
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+            self._cond.notify()
+
+    def flush(self):
+        """Writes every pending document now, on the calling thread."""
+        with self._cond:
+            paths = list(self._due)
+            self._due.clear()
+        for path in paths:
+            self._write(path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read {path}: {e}")
+            return None
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    ready = [path for path, due in self._due.items() if due <= now]
+                    if ready:
+                        break
+                    self._cond.wait(min(self._due.values()) - now if self._due else None)
+                for path in ready:
+                    del self._due[path]
+            for path in ready:
+                self._write(path)
+
+    def _write(self, path):
+        with self._io_lock:
+            with self._cond:
+                doc = self._docs.get(path)
+            try:
+                data = json.dumps(doc)
+            except RuntimeError:
+                # Its owner changed the document mid-serialization; write it next round.
+                with self._cond:
+                    self._due.setdefault(path, time.monotonic() + self.debounce)
+                    self._cond.notify()
+                return
+            tmp = path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+            except OSError as e:
+                logging.error(f"Failed to save {path}: {e}")
+
+
+storage = DocumentStore()
+atexit.register(storage.flush)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+_SPINTAX_VAR = re.compile(r'%([A-Za-z_][A-Za-z0-9_]*)%')
+_SPINTAX_WEIGHT = re.compile(r'\d+(?:\.\d+)?')
+_SPINTAX_ESCAPABLE = frozenset('{}|^%\\')
+_CARET = object()
+
+
+class _SpinAlt:
+    __slots__ = ("options", "cum_weights", "total", "count")
+
+    def __init__(self, options, weights):
+        self.options = options
+        # Distinct paths through this alternative; nested ones are complete by now.
+        self.count = sum(_count_paths(option) for option in options)
+        if all(w == 1 for w in weights) or sum(weights) <= 0:
+            self.cum_weights = None
+        else:
+            self.cum_weights = list(itertools.accumulate(weights))
+        self.total = sum(weights)
+
+    def pick(self):
+        if self.cum_weights is None:
+            return self.options[random.randrange(len(self.options))]
+        return self.options[bisect.bisect(self.cum_weights, random.random() * self.total)]
+
+
+def _count_paths(nodes) -> int:
+    total = 1
+    for node in nodes:
+        if type(node) is _SpinAlt:
+            total *= node.count
+    return total
+
+
+class _SpinVar:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class SpintaxTemplate:
+    """A spintax template parsed once into a tree and rendered in one walk.
+
+    Syntax: {a|b|c} picks one option and options may nest ({a|{b|c}}). An option
+    ending in ^N gets weight N ({Hi^3|Hello} picks "Hi" three times as often),
+    %name% is replaced by a render variable and a backslash escapes any of
+    { } | ^ % and itself; before any other character it is kept as text.
+    Unbalanced braces are kept as plain text.
+    """
+    __slots__ = ("source", "nodes", "is_static", "variables")
+
+    def __init__(self, source: str):
+        self.source = source
+        tokens = self._tokenize(source)
+        self.nodes = self._finish(self._parse(tokens))
+        self.is_static = all(isinstance(n, str) for n in self.nodes)
+        self.variables = frozenset(value for kind, value in tokens if kind == "%")
+
+    @staticmethod
+    def _tokenize(text):
+        tokens, buf = [], []
+        i, n = 0, len(text)
+        while i < n:
+            c = text[i]
+            if c == '\\' and i + 1 < n and text[i + 1] in _SPINTAX_ESCAPABLE:
+                buf.append(text[i + 1])
+                i += 2
+                continue
+            if c in '{}|^':
+                if buf:
+                    tokens.append(("lit", "".join(buf)))
+                    buf = []
+                tokens.append((c, None))
+                i += 1
+                continue
+            if c == '%':
+                m = _SPINTAX_VAR.match(text, i)
+                if m:
+                    if buf:
+                        tokens.append(("lit", "".join(buf)))
+                        buf = []
+                    tokens.append(("%", m.group(1)))
+                    i = m.end()
+                    continue
+            buf.append(c)
+            i += 1
+        if buf:
+            tokens.append(("lit", "".join(buf)))
+        return tokens
+
+    @staticmethod
+    def _match_braces(tokens):
+        """Indices of the '{' and '}' tokens that pair up; any other brace is text."""
+        opened, matched = [], set()
+        for i, (kind, _) in enumerate(tokens):
+            if kind == '{':
+                opened.append(i)
+            elif kind == '}' and opened:
+                matched.add(opened.pop())
+                matched.add(i)
+        return matched
+
+    def _parse(self, tokens):
+        """Builds the node tree in one pass, with an explicit stack of open alternatives."""
+        matched = self._match_braces(tokens)
+        seq = []
+        stack = []  # (enclosing sequence, options so far, their weights)
+        for i, (kind, value) in enumerate(tokens):
+            if kind == '{' and i in matched:
+                stack.append((seq, [], []))
+                seq = []
+            elif kind == '|' and stack:
+                self._add_option(seq, *stack[-1][1:])
+                seq = []
+            elif kind == '}' and i in matched:
+                parent, options, weights = stack.pop()
+                self._add_option(seq, options, weights)
+                parent.append(_SpinAlt(options, weights))
+                seq = parent
+            elif kind == "lit":
+                seq.append(value)
+            elif kind == "%":
+                seq.append(_SpinVar(value))
+            elif kind == '^':
+                seq.append(_CARET)
+            else:
+                seq.append(kind)
+        return seq
+
+    def _add_option(self, seq, options, weights):
+        weight = 1.0
+        if (len(seq) >= 2 and seq[-2] is _CARET and isinstance(seq[-1], str)
+                and _SPINTAX_WEIGHT.fullmatch(seq[-1])):
+            weight = float(seq[-1])
+            seq = seq[:-2]
+        options.append(self._finish(seq))
+        weights.append(weight)
+
+    @staticmethod
+    def _finish(nodes):
+        """Turns leftover carets into text and merges adjacent literals."""
+        out = []
+        for node in nodes:
+            if node is _CARET:
+                node = '^'
+            if isinstance(node, str) and out and isinstance(out[-1], str):
+                out[-1] += node
+            else:
+                out.append(node)
+        return out
+
+    def combinations(self) -> int:
+        """Number of distinct option paths through the template."""
+        return _count_paths(self.nodes)
+
+    def render(self, variables: Optional[Dict[str, str]] = None) -> str:
+        if self.is_static:
+            return "".join(self.nodes)
+        variables = variables or {}
+        out = []
+        # An explicit stack of node iterators, so nesting depth is not bounded by recursion.
+        stack = [iter(self.nodes)]
+        while stack:
+            for node in stack[-1]:
+                if type(node) is str:
+                    out.append(node)
+                elif type(node) is _SpinAlt:
+                    stack.append(iter(node.pick()))
+                    break
+                else:
+                    out.append(variables.get(node.name, f"%{node.name}%"))
+            else:
+                stack.pop()
+        return "".join(out)
+
+
+@functools.lru_cache(maxsize=128)
+def compile_spintax(text: str) -> SpintaxTemplate:
+    return SpintaxTemplate(text)
+
+
+def parse_spintax(text: str, variables: Optional[Dict[str, str]] = None) -> str:
+    """Parses spintax like {Hello|Hi|Hey} and picks a random value."""
+    return compile_spintax(text).render(variables)
+
+
+class VariantPool:
+    """Distinct spintax variants rendered in one batch before a run starts.
+
+    Variants are handed out round-robin from a shuffled order. Every group
+    remembers the last `window` variants it received and is always given one
+    outside that window when the pool is large enough.
+    """
+    def __init__(self, template: SpintaxTemplate, size: int = SPINTAX_VARIANTS,
+                 window: int = SPINTAX_REPEAT_WINDOW):
+        self.template = template
+        self.possible = template.combinations()
+        target = max(1, min(size, self.possible))
+        seen = {}
+        attempts = 0
+        while len(seen) < target and attempts < target * 20:
+            seen.setdefault(template.render(), None)
+            attempts += 1
+        self.variants = list(seen)
+        self.window = max(0, window)
+        self._order = list(range(len(self.variants)))
+        random.shuffle(self._order)
+        self._cursor = 0
+        self.history = {}
+
+    def take(self, gid, variables: Optional[Dict[str, str]] = None) -> str:
+        recent = self.history.get(gid)
+        if recent is None:
+            recent = self.history[gid] = collections.deque(maxlen=self.window)
+        for _ in range(len(self._order)):
+            idx = self._order[self._cursor]
+            self._cursor = (self._cursor + 1) % len(self._order)
+            if idx not in recent:
+                break
+        else:
+            # Fewer variants than the window: reuse the one this group saw longest ago.
+            last_seen = {v: pos for pos, v in enumerate(recent)}
+            idx = min(last_seen, key=last_seen.get)
+        recent.append(idx)
+        text = self.variants[idx]
+        if variables and self.template.variables:
+            for name in self.template.variables:
+                if name in variables:
+                    text = text.replace(f"%{name}%", variables[name])
+        return text
+
+
+def encode_input_peer(peer) -> Optional[list]:
+    """Compact JSON form of an InputPeerChannel / InputPeerChat."""
+    from telethon.tl.types import InputPeerChannel, InputPeerChat
+    if isinstance(peer, InputPeerChannel):
+        return ["channel", peer.channel_id, peer.access_hash]
+    if isinstance(peer, InputPeerChat):
+        return ["chat", peer.chat_id]
+    return None
+
+
+def decode_input_peer(data):
+    from telethon.tl.types import InputPeerChannel, InputPeerChat
+    if data[0] == "channel":
+        return InputPeerChannel(data[1], data[2])
+    if data[0] == "chat":
+        return InputPeerChat(data[1])
+    return None
+
+
+def encode_input_media(media) -> Optional[list]:
+    """Compact JSON form of an InputMediaPhoto / InputMediaDocument."""
+    from telethon.tl.types import InputMediaPhoto, InputMediaDocument
+    if isinstance(media, InputMediaPhoto):
+        kind = "photo"
+    elif isinstance(media, InputMediaDocument):
+        kind = "document"
+    else:
+        return None
+    ref = media.id
+    return [kind, ref.id, ref.access_hash, ref.file_reference.hex()]
+
+
+def decode_input_media(data):
+    from telethon.tl.types import InputMediaPhoto, InputMediaDocument, InputPhoto, InputDocument
+    kind, media_id, access_hash, file_reference = data
+    if kind == "photo":
+        return InputMediaPhoto(InputPhoto(media_id, access_hash, bytes.fromhex(file_reference)))
+    if kind == "document":
+        return InputMediaDocument(InputDocument(media_id, access_hash, bytes.fromhex(file_reference)))
+    return None
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def format_duration(seconds: float) -> str:
+    """Short human form: 45s, 12m 05s, 3h 20m."""
+    seconds = int(math.ceil(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+def attachment_error(paths: Sequence[str], message: str) -> Optional[str]:
+    """Why Telegram would refuse `paths` as one post captioned `message`, or None."""
+    for path in paths:
+        if not os.path.isfile(path):
+            return f"Attachment not found: {path}"
+    if paths and len(message) > CAPTION_MAX_LEN:
+        return f"Captions are limited to {CAPTION_MAX_LEN} characters."
+    if len(paths) > ALBUM_MAX_ITEMS:
+        return f"An album holds at most {ALBUM_MAX_ITEMS} files."
+    if len(paths) > 1:
+        # Photos and videos can share an album; other files only go with other files.
+        visual = {(mimetypes.guess_type(p)[0] or "").split("/")[0] in ("image", "video") for p in paths}
+        if len(visual) > 1:
+            return "An album cannot mix photos or videos with other files."
+    return None
+
+
+def import_telethon():
+    """Imports Telethon ahead of first use; safe to call from any thread."""
+    import telethon  # noqa: F401
+
+
+# ── Async infrastructure ──────────────────────────────────────────────────────
+class AsyncLoopThread(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run_coroutine(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+# ── Telegram backend ──────────────────────────────────────────────────────────
+class RateGovernor:
+    """Account-wide send governor.
+
+    Spaces sends at the current rate, keeps a minimum gap per peer and pauses
+    every send for exactly the server-specified time on FloodWaitError. The rate
+    is halved on each flood wait and raised by GOVERNOR_RATE_STEP after every
+    clean window, up to `max_rate` (AIMD).
+    """
+    def __init__(self, max_rate: float = BROADCAST_RATE_LIMIT):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.paused_until = 0.0
+        self._next_slot = 0.0
+        self._peer_next = {}
+        self._clean_since = time.monotonic()
+        self._lock = None
+
+    async def acquire(self, peer=None):
+        """Waits until both `peer` and the account may send again."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if peer is not None:
+            delay = self._peer_next.get(peer, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                ready = max(self._next_slot, self.paused_until)
+                if ready <= now:
+                    break
+                await asyncio.sleep(ready - now)
+            self._next_slot = now + 1.0 / self.rate
+        if peer is not None:
+            self._peer_next[peer] = now + PEER_MIN_SPACING
+
+    def on_success(self):
+        now = time.monotonic()
+        if now - self._clean_since >= GOVERNOR_CLEAN_WINDOW:
+            self.rate = min(self.max_rate, self.rate + GOVERNOR_RATE_STEP)
+            self._clean_since = now
+
+    def on_flood_wait(self, seconds: int):
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.rate = max(GOVERNOR_MIN_RATE, self.rate / 2)
+        self._clean_since = self.paused_until
+
+    def on_peer_wait(self, peer, seconds: int):
+        self._peer_next[peer] = max(self._peer_next.get(peer, 0), time.monotonic() + seconds)
+
+
+_media_cache_lock = threading.Lock()
+
+
+class SendExpired(Exception):
+    """A send was dropped because no governor slot came before its deadline."""
+
+
+class TelegramManager:
+    """One account. `client_factory` replaces TelegramClient (same constructor
+    signature), e.g. with mock_telegram.MockTelegramClient for offline runs."""
+    def __init__(self, loop_thread: AsyncLoopThread, log_callback, client_factory=None):
+        self.loop_thread = loop_thread
+        self.log = log_callback
+        self.client_factory = client_factory
+        self.client = None
+        self.phone = None
+        self.is_connected = False
+        self.governor = RateGovernor()
+        self.peers = {}
+        self.known_groups = {}
+        self.sync_state = {}
+        self._dirty = set()
+        self.media = {}
+        self._media_lock = None
+
+    @property
+    def session_name(self):
+        return self.phone or "default"
+
+    def _create_client(self, session_name):
+        from telethon import TelegramClient, events
+        from telethon.tl.types import UpdateChannel, UpdateChat, UpdateChatDefaultBannedRights
+        if not os.path.exists(SESSIONS_DIR):
+            os.makedirs(SESSIONS_DIR)
+        session_path = os.path.join(SESSIONS_DIR, session_name)
+        factory = self.client_factory or TelegramClient
+        # Sends must reach the governor on a FloodWait instead of Telethon sleeping
+        # through it; every other request goes through _retry_flood_wait().
+        self.client = factory(session_path, *api_credentials(), loop=self.loop_thread.loop,
+                              flood_sleep_threshold=0)
+        self.client.add_event_handler(
+            self._on_chat_update,
+            events.Raw(types=(UpdateChannel, UpdateChat, UpdateChatDefaultBannedRights)))
+        self._load_peers(session_name)
+
+    # Input peers (id + access_hash) are cached next to the session file so sends
+    # never have to resolve a bare dialog id through the network.
+    def _peers_path(self, session_name=None):
+        return os.path.join(SESSIONS_DIR, f"{session_name or self.session_name}.peers.json")
+
+    def _load_peers(self, session_name):
+        self.peers = {}
+        try:
+            for gid, data in storage.get(self._peers_path(session_name), {}).items():
+                peer = decode_input_peer(data)
+                if peer is not None:
+                    self.peers[int(gid)] = peer
+        except Exception:
+            self.peers = {}
+
+    def _save_peers(self):
+        storage.put(self._peers_path(),
+                    {gid: encode_input_peer(p) for gid, p in self.peers.items()})
+
+    def connect(self, phone=None):
+        if phone:
+            self.phone = phone
+            self._create_client(f"{phone}")
+
+        if not self.client:
+            self._create_client("default")
+
+        future = self.loop_thread.run_coroutine(self.client.connect())
+        return future
+
+    def is_user_authorized(self):
+        future = self.loop_thread.run_coroutine(self.client.is_user_authorized())
+        return future
+
+    def send_code_request(self, phone):
+        self.phone = phone
+        return self.loop_thread.run_coroutine(self.client.send_code_request(phone))
+
+    def sign_in(self, code, password=None):
+        return self.loop_thread.run_coroutine(self._sign_in_wrapper(code, password))
+
+    async def _sign_in_wrapper(self, code, password):
+        from telethon import errors
+        try:
+            await self.client.sign_in(self.phone, code)
+        except errors.SessionPasswordNeededError:
+            if password:
+                await self.client.sign_in(password=password)
+            else:
+                raise
+
+    def get_dialogs(self):
+        return self.loop_thread.run_coroutine(self._get_groups())
+
+    async def _on_chat_update(self, update):
+        """Marks groups whose membership, rights or slowmode changed for the next sync."""
+        from telethon import utils
+        from telethon.tl.types import PeerChannel, UpdateChannel, UpdateChat
+        if isinstance(update, UpdateChannel):
+            self._dirty.add(utils.get_peer_id(PeerChannel(update.channel_id)))
+        elif isinstance(update, UpdateChat):
+            self._dirty.add(-update.chat_id)
+        else:
+            self._dirty.add(utils.get_peer_id(update.peer))
+
+    async def _retry_flood_wait(self, call):
+        """Awaits `call()`, waiting out and retrying FloodWaits of up to FLOOD_RETRY_MAX.
+
+        The wait also pauses this account's sends through the governor.
+        """
+        from telethon import errors
+        while True:
+            try:
+                return await call()
+            except errors.FloodWaitError as e:
+                if e.seconds > FLOOD_RETRY_MAX:
+                    raise
+                self.governor.on_flood_wait(e.seconds)
+                self.log(f"FloodWait ({self.session_name}): retrying in {e.seconds}s.")
+                await asyncio.sleep(e.seconds)
+
+    def _sync_is_valid(self):
+        state = self.sync_state
+        return (state.get("version") == SYNC_STATE_VERSION
+                and "top_date" in state
+                and time.time() - state.get("full_synced_at", 0) < FULL_SYNC_MAX_AGE
+                and bool(self.known_groups))
+
+    def _load_blacklist(self):
+        return set(storage.get(BLACKLIST_FILE, []))
+
+    def _group_from_dialog(self, dialog, blacklist, peers):
+        """Returns the group dict for a sendable group dialog, or None."""
+        is_group = dialog.is_group
+        is_megagroup = False
+        if dialog.is_channel:
+            entity = dialog.entity
+            if getattr(entity, 'megagroup', False):
+                is_megagroup = True
+
+        if not (is_group or is_megagroup):
+            return None
+
+        entity = dialog.entity
+        can_send = True
+        if hasattr(entity, 'restricted') and entity.restricted:
+            can_send = False
+        if hasattr(entity, 'left') and entity.left:
+            can_send = False
+
+        if not can_send:
+            return None
+
+        slowmode = getattr(entity, 'slowmode_seconds', 0) or 0
+        if encode_input_peer(dialog.input_entity) is not None:
+            peers[dialog.id] = dialog.input_entity
+
+        return {
+            "id": dialog.id,
+            "title": dialog.name,
+            "type": "megagroup" if is_megagroup else "group",
+            "slowmode": slowmode,
+            "is_blacklisted": dialog.id in blacklist
+        }
+
+    async def _get_groups(self, full=False):
+        blacklist = self._load_blacklist()
+        if not full and self._sync_is_valid():
+            try:
+                groups = await self._incremental_sync(blacklist)
+            except Exception as e:
+                self.log(f"Incremental sync failed ({e}), falling back to a full refresh.")
+                groups = await self._retry_flood_wait(lambda: self._full_sync(blacklist))
+        else:
+            groups = await self._retry_flood_wait(lambda: self._full_sync(blacklist))
+
+        self.known_groups = {g['id']: g for g in groups}
+        self.sync_state["version"] = SYNC_STATE_VERSION
+        self._save_peers()
+        return groups
+
+    async def _full_sync(self, blacklist):
+        groups = []
+        peers = {}
+        self._dirty.clear()
+        top_date = 0.0
+        async for dialog in self.client.iter_dialogs():
+            if dialog.date:
+                top_date = max(top_date, dialog.date.timestamp())
+            grp = self._group_from_dialog(dialog, blacklist, peers)
+            if grp:
+                groups.append(grp)
+        self.peers = peers
+        # Incremental syncs only see recent dialogs and live updates, so groups
+        # that changed while the app was closed are only caught by a full sync.
+        self.sync_state = {"top_date": top_date, "full_synced_at": time.time()}
+        return groups
+
+    async def _incremental_sync(self, blacklist):
+        """Fetches only dialogs with activity since the last sync plus groups
+        flagged by live updates; everything else comes from `known_groups`."""
+        from telethon import errors
+        groups = {gid: dict(g, is_blacklisted=gid in blacklist) for gid, g in self.known_groups.items()}
+        top_date = self.sync_state["top_date"]
+
+        # Dialogs arrive newest first (after the pinned ones), so the walk can stop
+        # at the first unpinned dialog that was already seen by the last sync.
+        async def _walk():
+            newest = top_date
+            async for dialog in self.client.iter_dialogs():
+                date = dialog.date.timestamp() if dialog.date else 0.0
+                if not dialog.pinned and date <= top_date:
+                    break
+                newest = max(newest, date)
+                grp = self._group_from_dialog(dialog, blacklist, self.peers)
+                if grp:
+                    groups[dialog.id] = grp
+                else:
+                    groups.pop(dialog.id, None)
+            return newest
+
+        newest = await self._retry_flood_wait(_walk)
+
+        # Errors meaning the account can no longer reach the group at all.
+        gone_errors = (errors.ChannelPrivateError, errors.ChannelInvalidError, errors.ChatIdInvalidError,
+                       errors.ChatForbiddenError, errors.PeerIdInvalidError, errors.UserBannedInChannelError)
+        dirty, self._dirty = self._dirty, set()
+        for gid in dirty:
+            if gid not in groups:
+                continue
+            try:
+                grp = await self._refresh_group(groups[gid])
+            except gone_errors:
+                grp = None
+            except Exception as e:
+                # Keep the known entry and try again on the next sync.
+                self.log(f"Could not refresh group {gid} ({e}), keeping it.")
+                self._dirty.add(gid)
+                continue
+            if grp is None:
+                groups.pop(gid)
+                self.peers.pop(gid, None)
+
+        self.sync_state["top_date"] = newest
+        return list(groups.values())
+
+    async def _refresh_group(self, grp):
+        """Re-reads one group's entity; returns None when it can no longer be sent to."""
+        from telethon.tl.functions.channels import GetFullChannelRequest
+        from telethon.tl.types import Channel, ChannelForbidden, ChatForbidden
+        peer = self.peers.get(grp['id'], grp['id'])
+        entity = await self._retry_flood_wait(lambda: self.client.get_entity(peer))
+        if isinstance(entity, (ChannelForbidden, ChatForbidden)):
+            return None
+        if getattr(entity, 'restricted', False) or getattr(entity, 'left', False) \
+                or getattr(entity, 'deactivated', False):
+            return None
+        slowmode = grp['slowmode']
+        if isinstance(entity, Channel):
+            full = await self._retry_flood_wait(lambda: self.client(GetFullChannelRequest(entity)))
+            slowmode = full.full_chat.slowmode_seconds or 0
+        grp.update(title=getattr(entity, 'title', grp['title']), slowmode=slowmode)
+        return grp
+
+    # Attachments are uploaded once per account and sent by reference. The
+    # resulting InputMedia is cached by content hash in MEDIA_CACHE_FILE, so a
+    # file already uploaded in an earlier run is not uploaded again.
+    async def prepare_media(self, path: str, refresh: bool = False, digest: Optional[str] = None):
+        """Makes `path` sendable by reference; returns its InputMedia.
+
+        `digest` is the file_digest() of `path` when the caller already has it.
+        """
+        from telethon import utils
+        from telethon.tl.functions.messages import UploadMediaRequest
+        from telethon.tl.types import InputPeerSelf, InputMediaUploadedPhoto, InputMediaUploadedDocument
+        if digest is None:
+            digest = await asyncio.to_thread(file_digest, path)
+        cached = storage.get(MEDIA_CACHE_FILE, {}).get(self.session_name, {}).get(digest)
+        if cached and not refresh:
+            self.media[path] = decode_input_media(cached)
+            return self.media[path]
+
+        uploaded = await self._upload_file(path)
+        if utils.is_image(path):
+            media = InputMediaUploadedPhoto(uploaded)
+        else:
+            attributes, mime_type = utils.get_attributes(path, supports_streaming=True)
+            media = InputMediaUploadedDocument(uploaded, mime_type, attributes)
+        # uploadMedia turns the upload into a reusable photo/document without posting it.
+        result = await self._retry_flood_wait(lambda: self.client(UploadMediaRequest(InputPeerSelf(), media)))
+        self.media[path] = utils.get_input_media(result)
+        encoded = encode_input_media(self.media[path])
+        if encoded is not None:
+            # Uploads for every account and file run at once; they share one document.
+            with _media_cache_lock:
+                cache = storage.get(MEDIA_CACHE_FILE, {})
+                cache.setdefault(self.session_name, {})[digest] = encoded
+                storage.put(MEDIA_CACHE_FILE, cache)
+        return self.media[path]
+
+    async def _upload_file(self, path: str):
+        """Chunked upload with UPLOAD_WORKERS parts in flight at once."""
+        from telethon.helpers import generate_random_long
+        from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+        from telethon.tl.types import InputFile, InputFileBig
+        size = os.path.getsize(path)
+        part_count = max(1, math.ceil(size / UPLOAD_PART_SIZE))
+        is_big = size > UPLOAD_BIG_FILE
+        file_id = generate_random_long()
+        parts = iter(range(part_count))
+
+        async def _worker():
+            with open(path, "rb") as f:
+                for index in parts:  # shared by all workers, so each part is taken once
+                    f.seek(index * UPLOAD_PART_SIZE)
+                    chunk = f.read(UPLOAD_PART_SIZE)
+                    if is_big:
+                        request = SaveBigFilePartRequest(file_id, index, part_count, chunk)
+                    else:
+                        request = SaveFilePartRequest(file_id, index, chunk)
+                    if not await self._retry_flood_wait(lambda request=request: self.client(request)):
+                        raise RuntimeError(f"upload of part {index} of {path} was rejected")
+
+        await asyncio.gather(*(_worker() for _ in range(min(UPLOAD_WORKERS, part_count))))
+        name = os.path.basename(path)
+        if is_big:
+            return InputFileBig(file_id, part_count, name)
+        return InputFile(file_id, part_count, name, md5_checksum="")
+
+    async def _refresh_media(self, used: Dict[str, object]):
+        """Uploads again the attachments of a send that hit an expired file reference."""
+        if self._media_lock is None:
+            self._media_lock = asyncio.Lock()
+        async with self._media_lock:
+            for path, media in used.items():
+                if self.media.get(path) is media:  # not refreshed by another send yet
+                    self.log(f"Cached upload of {os.path.basename(path)} expired, uploading again.")
+                    await self.prepare_media(path, refresh=True)
+
+    def send_message(self, entity_id, message):
+        return self.loop_thread.run_coroutine(self.send_message_async(entity_id, message))
+
+    async def send_message_async(self, entity_id, message, timeout=None, attachments: Sequence[str] = (),
+                                 deadline: Optional[float] = None):
+        """Sends through the rate governor; `timeout` only covers the request itself.
+
+        `attachments` are paths already passed to prepare_media(), and the
+        message becomes their caption. Several attachments go out as one album
+        in a single request. If the governor has no slot before `deadline`
+        (monotonic), nothing is sent and SendExpired is raised.
+        """
+        from telethon import errors
+        if deadline is None:
+            await self.governor.acquire(entity_id)
+        else:
+            try:
+                await asyncio.wait_for(self.governor.acquire(entity_id), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise SendExpired(entity_id) from None
+        peer = self.peers.get(entity_id, entity_id)
+        media = [self.media[path] for path in attachments]
+        started = time.monotonic()
+        try:
+            if len(media) > 1:
+                request = self.client.send_file(peer, media, caption=message)
+            else:
+                request = self.client.send_message(peer, message, file=media[0] if media else None)
+            result = await asyncio.wait_for(request, timeout)
+        except errors.FileReferenceExpiredError as e:
+            self._record_send(entity_id, "media_refresh", started, e)
+            await self._refresh_media(dict(zip(attachments, media)))
+            raise
+        except errors.FloodWaitError as e:
+            self.governor.on_flood_wait(e.seconds)
+            self._record_send(entity_id, "flood_wait", started, e, wait_s=e.seconds)
+            self.log(f"FloodWait ({self.session_name}): pausing sends for {e.seconds}s "
+                     f"(rate now {self.governor.rate:.2f} msg/s)")
+            raise
+        except errors.SlowModeWaitError as e:
+            self.governor.on_peer_wait(entity_id, e.seconds)
+            self._record_send(entity_id, "slowmode", started, e, wait_s=e.seconds)
+            raise
+        except asyncio.TimeoutError as e:
+            self._record_send(entity_id, "timeout", started, e)
+            raise
+        except Exception as e:
+            self._record_send(entity_id, "error", started, e)
+            raise
+        self.governor.on_success()
+        self._record_send(entity_id, "sent", started)
+        return result
+
+    def _record_send(self, entity_id, outcome, started, error=None, wait_s=None):
+        """Queues one structured send record for the event log and the metrics store."""
+        level = logging.INFO if outcome == "sent" else logging.WARNING
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+        error_class = type(error).__name__ if error else None
+        event_log.log(level, "%s %s", outcome, entity_id, extra={
+            "account": self.session_name,
+            "group_id": entity_id,
+            "outcome": outcome,
+            "latency_ms": latency_ms,
+            "error_class": error_class,
+            "wait_s": wait_s,
+        })
+        metrics.record(self.session_name, entity_id, outcome, latency_ms, error_class, wait_s)
+
+
+class ManagerPool:
+    """One TelegramManager per authorized session file in SESSIONS_DIR.
+
+    The primary manager is the one driven by the login screen; every other
+    authorized session is picked up on the first dialog fetch. Groups are merged
+    by id and tagged with the accounts that are members of them.
+    """
+    def __init__(self, loop_thread: AsyncLoopThread, log_callback, primary: TelegramManager):
+        self.loop_thread = loop_thread
+        self.log = log_callback
+        self.primary = primary
+        self.managers = {}
+        self._discovered = False
+        self._saved = self._load_saved_groups()
+
+    def _load_saved_groups(self):
+        data = storage.get(GROUPS_FILE)
+        return data if isinstance(data, dict) else {}
+
+    def add(self, manager: TelegramManager):
+        name = manager.session_name
+        if name not in self.managers:
+            self._restore_sync(manager)
+        self.managers[name] = manager
+
+    def _restore_sync(self, manager: TelegramManager):
+        """Seeds a manager with the dialog sync state saved in groups.json."""
+        name = manager.session_name
+        state = self._saved.get("sync", {}).get(name)
+        if not state:
+            return
+        manager.sync_state = dict(state)
+        manager.known_groups = {
+            g['id']: {k: v for k, v in g.items() if k != 'accounts'}
+            for g in self._saved.get("groups", []) if name in g.get('accounts', [])
+        }
+
+    def cached_groups(self) -> List[Dict]:
+        """Groups saved by the last session, if they belong to the primary account."""
+        if self.primary.session_name not in self._saved.get("sync", {}):
+            return []
+        return self._saved.get("groups", [])
+
+    def sync_states(self) -> Dict[str, Dict]:
+        return {name: m.sync_state for name, m in self.managers.items() if m.sync_state}
+
+    def save_groups(self, groups: List[Dict]):
+        """Stores groups.json together with every account's dialog sync state."""
+        storage.put(GROUPS_FILE, {"groups": groups, "sync": self.sync_states()})
+
+    def get_dialogs(self, full=False):
+        return self.loop_thread.run_coroutine(self._get_groups(full))
+
+    async def _discover(self):
+        self.add(self.primary)
+        if os.path.isdir(SESSIONS_DIR):
+            for fname in sorted(os.listdir(SESSIONS_DIR)):
+                name, ext = os.path.splitext(fname)
+                if ext != ".session" or name in self.managers:
+                    continue
+                manager = TelegramManager(self.loop_thread, self.log)
+                manager.phone = None if name == "default" else name
+                manager._create_client(name)
+                try:
+                    await manager.client.connect()
+                    if await manager.client.is_user_authorized():
+                        self.add(manager)
+                        self.log(f"Loaded account {name}.")
+                    else:
+                        await manager.client.disconnect()
+                except Exception as e:
+                    self.log(f"Failed to load account {name}: {e}")
+        self._discovered = True
+
+    async def _get_groups(self, full=False):
+        if not self._discovered:
+            await self._discover()
+        self.add(self.primary)
+
+        names = list(self.managers)
+        results = await asyncio.gather(
+            *(self.managers[n]._get_groups(full) for n in names), return_exceptions=True)
+
+        merged = {}
+        for name, groups in zip(names, results):
+            if isinstance(groups, Exception):
+                if self.managers[name] is self.primary:
+                    raise groups
+                self.log(f"Failed to fetch groups for {name}: {groups}")
+                continue
+            for grp in groups:
+                entry = merged.setdefault(grp['id'], dict(grp, accounts=[]))
+                entry['accounts'].append(name)
+        return list(merged.values())
+
+    def shard(self, targets: List[Dict]) -> Dict[TelegramManager, List[Dict]]:
+        """Assigns each target to the least-loaded account that is a member of it."""
+        load = {name: 0 for name in self.managers}
+        shards = {}
+        candidates = []
+        for grp in targets:
+            names = [n for n in grp.get('accounts', []) if n in self.managers]
+            candidates.append((names or [self.primary.session_name], grp))
+        # Groups reachable from fewer accounts are placed first so they don't end
+        # up queued behind groups that could have gone anywhere.
+        candidates.sort(key=lambda c: len(c[0]))
+        for names, grp in candidates:
+            name = min(names, key=lambda n: load.get(n, 0))
+            load[name] = load.get(name, 0) + 1
+            manager = self.managers.get(name, self.primary)
+            shards.setdefault(manager, []).append(grp)
+        return shards
+
+    def disconnect_all(self):
+        for manager in self.managers.values():
+            if manager.client:
+                self.loop_thread.run_coroutine(manager.client.disconnect())
+
+
+# ── Job store ─────────────────────────────────────────────────────────────────
+def connect_db(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class BatchWriter:
+    """Applies queued SQL statements to a database from one background thread.
+
+    Callers never wait on disk. Whatever is queued when the thread wakes is
+    committed in one transaction, with runs of the same statement going
+    through executemany().
+    """
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, sql: str, params=()):
+        self._queue.put((sql, params))
+
+    def close(self):
+        """Commits everything queued and stops the thread; later puts are dropped."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        conn = connect_db(self.path)
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    statements = (item for item in batch if item is not None)
+                    for sql, group in itertools.groupby(statements, key=lambda item: item[0]):
+                        conn.executemany(sql, [params for _, params in group])
+            except sqlite3.Error as e:
+                logging.error(f"{self.name} write failed: {e}")
+            if None in batch:
+                conn.close()
+                return
+
+
+class JobStore:
+    """Durable broadcast jobs in a SQLite WAL database.
+
+    A job records its settings, its targets and, per group, the last send,
+    the number of attempts, the last outcome and when the group may be sent
+    to next, so an interrupted job can be resumed where it stopped. Per-send
+    updates go through a BatchWriter, so the broadcast loop never waits on disk.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            message TEXT NOT NULL,
+            interval INTEGER NOT NULL,
+            concurrency INTEGER NOT NULL,
+            spintax INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            ends_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            media TEXT NOT NULL DEFAULT '[]'
+        );
+        CREATE TABLE IF NOT EXISTS job_targets (
+            job_id INTEGER NOT NULL REFERENCES jobs(id),
+            group_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            slowmode INTEGER NOT NULL DEFAULT 0,
+            last_sent REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            outcome TEXT,
+            next_at REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (job_id, group_id)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        self._writer = BatchWriter(path, "Job store")
+
+    def _connect(self):
+        return connect_db(self.path)
+
+    def _migrate(self):
+        """Adds columns introduced after a database was created."""
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "media" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN media TEXT NOT NULL DEFAULT '[]'")
+
+    def create_job(self, message: str, interval: int, duration_min: float, concurrency: int,
+                   spintax: bool, targets: List[Dict], media: Sequence[str] = ()) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            job_id = self._conn.execute(
+                "INSERT INTO jobs (message, interval, concurrency, spintax, created_at, ends_at, media) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (message, interval, concurrency, int(spintax), now, now + duration_min * 60,
+                 json.dumps(list(media)))).lastrowid
+            self._conn.executemany(
+                "INSERT INTO job_targets (job_id, group_id, title, slowmode) VALUES (?, ?, ?, ?)",
+                [(job_id, g['id'], g['title'], g.get('slowmode', 0)) for g in targets])
+        return job_id
+
+    def job(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_dict(row)
+
+    def progress(self, job_id: int) -> Dict[int, Dict]:
+        """Per-group state of a job, keyed by group id."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM job_targets WHERE job_id = ?", (job_id,)).fetchall()
+        return {row['group_id']: dict(row) for row in rows}
+
+    def targets(self, job_id: int, groups: List[Dict]) -> List[Dict]:
+        """The job's targets, using the current dicts from `groups` where present so
+        account tags are up to date; groups blacklisted since are left out."""
+        known = {g['id']: g for g in groups}
+        targets = []
+        for gid, row in self.progress(job_id).items():
+            grp = known.get(gid) or {"id": gid, "title": row['title'], "slowmode": row['slowmode']}
+            if not grp.get('is_blacklisted'):
+                targets.append(grp)
+        return targets
+
+    def interrupted(self) -> Optional[Dict]:
+        """The newest job that was still running when the process ended, if any
+        time is left on it; running jobs past their end are closed as expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'expired' WHERE status = 'running' AND ends_at <= ?", (now,))
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'running' ORDER BY id DESC LIMIT 1").fetchone()
+        return self._job_dict(row)
+
+    @staticmethod
+    def _job_dict(row) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['media'] = json.loads(job['media'])
+        return job
+
+    def record(self, job_id: int, gid, outcome: str, next_at: float, sent_at: Optional[float] = None):
+        """Queues one send attempt; `next_at` is the wall-clock time the group may be sent to again."""
+        self._writer.put(
+            "UPDATE job_targets SET attempts = attempts + 1, outcome = ?, next_at = ?, "
+            "last_sent = COALESCE(?, last_sent) WHERE job_id = ? AND group_id = ?",
+            (outcome, next_at, sent_at, job_id, gid))
+
+    def finish(self, job_id: int, status: str):
+        self._writer.put("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+
+    def close(self):
+        self._writer.close()
+
+
+# ── Metrics store ─────────────────────────────────────────────────────────────
+class MetricsStore:
+    """Every send attempt as one row in an append-only SQLite WAL database.
+
+    Rows are queued by the send path and inserted in batches through a
+    BatchWriter. The database is opened on first use, so importing core stays
+    free of disk work.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sends (
+            ts REAL NOT NULL,
+            account TEXT NOT NULL,
+            group_id INTEGER NOT NULL,
+            outcome TEXT NOT NULL,
+            latency_ms REAL NOT NULL,
+            error TEXT,
+            wait_s INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS sends_by_group ON sends (group_id, ts);
+        CREATE INDEX IF NOT EXISTS sends_by_ts ON sends (ts);
+    """
+    # Percentiles are nearest-rank over successful sends: row ceil(p * n) in latency order.
+    GROUP_STATS = """
+        WITH recent AS (
+            SELECT * FROM sends WHERE ts >= :since
+        ), ranked AS (
+            SELECT group_id, latency_ms,
+                   ROW_NUMBER() OVER (PARTITION BY group_id ORDER BY latency_ms) AS pos,
+                   COUNT(*) OVER (PARTITION BY group_id) AS n
+            FROM recent WHERE outcome = 'sent'
+        ), percentiles AS (
+            SELECT group_id,
+                   MAX(CASE WHEN pos = (n + 1) / 2 THEN latency_ms END) AS p50_ms,
+                   MAX(CASE WHEN pos = (n * 95 + 99) / 100 THEN latency_ms END) AS p95_ms
+            FROM ranked GROUP BY group_id
+        )
+        SELECT r.group_id,
+               COUNT(*) AS attempts,
+               SUM(r.outcome = 'sent') AS sent,
+               SUM(r.outcome IN ('error', 'timeout')) AS failed,
+               SUM(r.outcome = 'slowmode') AS slowmode,
+               SUM(r.outcome = 'flood_wait') AS flood_wait,
+               AVG(CASE WHEN r.outcome = 'sent' THEN r.latency_ms END) AS mean_ms,
+               p.p50_ms, p.p95_ms,
+               MAX(r.ts) AS last_ts
+        FROM recent r LEFT JOIN percentiles p USING (group_id)
+        GROUP BY r.group_id
+    """
+
+    def __init__(self, path: str = METRICS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def _open(self):
+        with self._lock:
+            if self._writer is not None:
+                return
+            conn = connect_db(self.path)
+            conn.executescript(self.SCHEMA)
+            conn.close()
+            self._writer = BatchWriter(self.path, "Metrics store")
+
+    def record(self, account: str, group_id, outcome: str, latency_ms: float,
+               error: Optional[str] = None, wait_s: Optional[int] = None):
+        if self._writer is None:
+            self._open()
+        self._writer.put("INSERT INTO sends VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (time.time(), account, group_id, outcome, latency_ms, error, wait_s))
+
+    def group_stats(self, since: float = 0.0) -> List[Dict]:
+        """Per-group attempts, outcome counts and latency (mean, p50, p95 in ms) since
+        `since` (epoch seconds). Blocking; run it off the UI thread."""
+        self._open()
+        conn = connect_db(self.path)
+        try:
+            return [dict(row) for row in conn.execute(self.GROUP_STATS, {"since": since})]
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+metrics = MetricsStore()
+
+
+# ── Broadcast engine ──────────────────────────────────────────────────────────
+class SlowmodeTracker:
+    """Per-group slowmode deadlines on the monotonic clock.
+
+    Written from the broadcast loop and read from the Tk thread. Expired
+    deadlines are dropped lazily through a heap, so checking for running
+    countdowns does not depend on the number of groups.
+    """
+    def __init__(self):
+        self._deadlines = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def set(self, gid, seconds: float):
+        deadline = time.monotonic() + seconds
+        with self._lock:
+            self._deadlines[gid] = deadline
+            heapq.heappush(self._heap, (deadline, gid))
+
+    def remaining(self, gid) -> int:
+        deadline = self._deadlines.get(gid)
+        if deadline is None:
+            return 0
+        return max(0, math.ceil(deadline - time.monotonic()))
+
+    def active(self) -> bool:
+        """Drops expired deadlines and reports whether any countdown is running."""
+        now = time.monotonic()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, gid = heapq.heappop(self._heap)
+                if self._deadlines.get(gid) == deadline:
+                    del self._deadlines[gid]
+            return bool(self._deadlines)
+
+
+class DeadlineScheduler:
+    """Min-heap of group ids keyed by the monotonic time they may next be sent to."""
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()
+        self.closed = False
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, gid, deadline: float):
+        heapq.heappush(self._heap, (deadline, next(self._seq), gid))
+        self._changed.set()
+
+    def close(self):
+        self.closed = True
+        self._changed.set()
+
+    def next_deadline(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    async def pop_due(self, until: float):
+        """Sleeps until the earliest deadline and pops it.
+
+        Returns None once `until` is reached or the scheduler is closed.
+        """
+        while not self.closed:
+            self._changed.clear()
+            now = time.monotonic()
+            if now >= until:
+                return None
+            if self._heap and self._heap[0][0] <= now:
+                return heapq.heappop(self._heap)[2]
+            wake = min(self._heap[0][0], until) if self._heap else until
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wake - now)
+            except asyncio.TimeoutError:
+                pass
+        return None
+
+
+class RollingCounter:
+    """Event counts over a few fixed windows, in a ring of one-second buckets.
+
+    Each window keeps a running sum: a bucket is added to it when counted and
+    subtracted once the window slides past it, so total() is O(1) and add() is
+    amortised O(1) in the seconds elapsed.
+    """
+    def __init__(self, windows: Sequence[int] = STATS_WINDOWS):
+        self.span = max(windows)
+        self._counts = [0] * self.span
+        self._sums = dict.fromkeys(windows, 0)
+        self._second: Optional[int] = None  # newest second the ring has advanced to
+
+    def _advance(self, second: int):
+        if self._second is None or second - self._second >= self.span:
+            self._counts = [0] * self.span
+            self._sums = dict.fromkeys(self._sums, 0)
+        else:
+            for current in range(self._second + 1, second + 1):
+                for window in self._sums:
+                    self._sums[window] -= self._counts[(current - window) % self.span]
+                self._counts[current % self.span] = 0
+        self._second = second
+
+    def add(self, now: float, n: int = 1):
+        second = int(now)
+        if self._second is None or second > self._second:
+            self._advance(second)
+        age = self._second - second
+        if age >= self.span:
+            return
+        self._counts[second % self.span] += n
+        for window in self._sums:
+            if age < window:
+                self._sums[window] += n
+
+    def total(self, now: float, window: int) -> int:
+        second = int(now)
+        if self._second is None or second > self._second:
+            self._advance(second)
+        return self._sums[window]
+
+
+class BroadcastEngine:
+    """Runs one broadcast on the AsyncLoopThread loop.
+
+    `shards` maps each TelegramManager to the groups it should serve. Every shard
+    has its own DeadlineScheduler and its own semaphore bounding the sends in
+    flight, so a FloodWait pause in one account's RateGovernor never holds up the
+    others. With a JobStore, every attempt is recorded under `job_id` and groups
+    the job already served start at their recorded next-send time. `media` files
+    are uploaded once per account before the first send and then sent by
+    reference, with the message as their caption; several files make an album,
+    still one request per group.
+
+    With a `stats_callback`, the engine reports a snapshot() every
+    STATS_INTERVAL seconds: rolling counts per outcome, sends in flight, the
+    time left in the current pass and when the next group becomes due.
+    """
+    def __init__(self, shards: Dict[TelegramManager, List[Dict]], message: str,
+                 interval: int, duration_min: int, concurrency: int = BROADCAST_CONCURRENCY,
+                 spintax: bool = False, slowmode: Optional[SlowmodeTracker] = None,
+                 spintax_variants: int = SPINTAX_VARIANTS, spintax_window: int = SPINTAX_REPEAT_WINDOW,
+                 log_callback=print, progress_callback=None, stats_callback=None,
+                 store: Optional[JobStore] = None, job_id: Optional[int] = None,
+                 media: Sequence[str] = ()):
+        self.shards = {m: {g['id']: g for g in targets} for m, targets in shards.items() if targets}
+        self.total_targets = sum(len(t) for t in self.shards.values())
+        self.message = message
+        self.media = list(media)
+        self.interval = interval
+        self.duration_min = duration_min
+        self.concurrency = max(1, concurrency)
+        self.variants = None
+        if spintax:
+            self.variants = VariantPool(compile_spintax(message), spintax_variants, spintax_window)
+        self.slowmode = slowmode or SlowmodeTracker()
+        self.log = log_callback
+        self.on_progress = progress_callback
+        self.on_stats = stats_callback
+        self.counters = {name: RollingCounter() for name in ("sent", "failed", "slowmode", "flood_wait")}
+        self._in_flight = []  # one set of dispatched sends per shard
+        # A pass ends once every target has been sent to once more; _pass_done[k]
+        # counts the targets sent to at least k times.
+        self._send_counts = collections.Counter()
+        self._pass_done = collections.Counter()
+        self._pass = 1
+        self._started = time.time()
+        self.last_sent = {}
+        self.is_running = False
+        self._served = set()
+        self._schedulers = []
+        self._loop = None
+        self._stop_requested = False
+        self._resumable = False
+        self.store = store
+        self.job_id = job_id
+        self._resume = store.progress(job_id) if store else {}
+        for targets in self.shards.values():
+            for gid in targets:
+                state = self._resume.get(gid)
+                if state and state['last_sent']:
+                    self.last_sent[gid] = state['last_sent']
+                    self._served.add(gid)
+                    self._count_pass(gid)
+
+    def stop(self, resumable: bool = False):
+        """Thread-safe: may be called from the Tk thread. A resumable stop leaves
+        the stored job open so it can be resumed later."""
+        self._resumable = resumable
+        self._stop_requested = True
+        self.is_running = False
+        if self._loop is not None:
+            for scheduler in self._schedulers:
+                self._loop.call_soon_threadsafe(scheduler.close)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._schedulers = [DeadlineScheduler() for _ in self.shards]
+        self.end_time = time.monotonic() + self.duration_min * 60
+        self.is_running = not self._stop_requested
+        self._started = time.time()
+        reporter = asyncio.ensure_future(self._report_stats()) if self.on_stats else None
+        try:
+            if self.media and not await self._prepare_media():
+                self._stop_requested = True
+                self.is_running = False
+                return
+            await asyncio.gather(*(
+                self._run_shard(manager, targets, scheduler)
+                for (manager, targets), scheduler in zip(self.shards.items(), self._schedulers)
+            ))
+        finally:
+            self.is_running = False
+            if reporter:
+                reporter.cancel()
+            if self.store and not self._resumable:
+                self.store.finish(self.job_id, "stopped" if self._stop_requested else "done")
+
+    def _count_pass(self, gid):
+        self._send_counts[gid] += 1
+        self._pass_done[self._send_counts[gid]] += 1
+        while self._pass_done[self._pass] >= self.total_targets > 0:
+            self._pass += 1
+
+    def snapshot(self) -> Dict:
+        """Live figures for a dashboard. Call it on the engine's loop; stats_callback
+        receives one every STATS_INTERVAL seconds."""
+        now, mono = time.time(), time.monotonic()
+        stats = {f"{name}_{window // 60}m": counter.total(now, window)
+                 for name, counter in self.counters.items() for window in STATS_WINDOWS}
+        # Rate over the last minute, or over the run so far if it is younger.
+        rate = stats["sent_1m"] / max(1.0, min(60.0, now - self._started))
+        left = self.total_targets - self._pass_done[self._pass]
+        due = [s.next_deadline() for s in self._schedulers if len(s)]
+        stats.update(
+            in_flight=sum(len(tasks) for tasks in self._in_flight),
+            rate=rate,
+            pass_number=self._pass,
+            pass_left=left,
+            pass_eta_s=left / rate if rate else None,
+            next_send_in_s=max(0.0, min(due) - mono) if due else None,
+        )
+        return stats
+
+    async def _report_stats(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            self.on_stats(self.snapshot())
+
+    async def _prepare_media(self) -> bool:
+        """Uploads the attachments on every account in parallel; uploads are per account.
+
+        Each file is hashed once here, not once per account.
+        """
+        self.log(f"Preparing {len(self.media)} attachment(s) on {len(self.shards)} account(s)…")
+        try:
+            digests = await asyncio.gather(*(asyncio.to_thread(file_digest, path) for path in self.media))
+        except OSError as e:
+            self.log(f"Failed to read attachment: {e}")
+            return False
+        results = await asyncio.gather(*(
+            manager.prepare_media(path, digest=digest)
+            for manager in self.shards for path, digest in zip(self.media, digests)
+        ), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        for e in failed:
+            self.log(f"Failed to upload attachment: {e}")
+        return not failed
+
+    async def _run_shard(self, manager, targets, scheduler):
+        slots = asyncio.Semaphore(self.concurrency)
+        now, wall = time.monotonic(), time.time()
+        for gid, grp in targets.items():
+            delay = self.slowmode.remaining(gid)
+            if gid in self._resume:
+                delay = max(delay, self._resume[gid]['next_at'] - wall)
+            scheduler.push(gid, now + delay)
+
+        in_flight = set()
+        self._in_flight.append(in_flight)
+        while self.is_running:
+            await slots.acquire()
+            gid = await scheduler.pop_due(self.end_time)
+            if gid is None or not self.is_running:
+                slots.release()
+                break
+            task = asyncio.ensure_future(self._dispatch(manager, targets[gid], scheduler, slots))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if self._stop_requested:
+            # Sends parked behind a FloodWait pause would otherwise hold the stop.
+            for task in in_flight:
+                task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _dispatch(self, manager, grp, scheduler, slots):
+        try:
+            outcome, wait = await self._send(manager, grp)
+        finally:
+            slots.release()
+        if outcome == "expired":
+            return
+        if outcome != "media_refresh":  # a retry with fresh media, not a result
+            self.counters["failed" if outcome in ("timeout", "error") else outcome].add(time.time())
+        if self.store:
+            sent_at = self.last_sent[grp['id']] if outcome == "sent" else None
+            self.store.record(self.job_id, grp['id'], outcome, time.time() + wait, sent_at)
+        if self.is_running:
+            scheduler.push(grp['id'], time.monotonic() + wait)
+
+    async def _send(self, manager, grp):
+        """Sends one message; returns the outcome and how long the group must rest afterwards."""
+        from telethon import errors
+        gid = grp['id']
+        try:
+            msg_to_send = self.variants.take(gid, {"group": grp['title']}) if self.variants else self.message
+            self.log(f"Sending → {grp['title']}…")
+            await manager.send_message_async(gid, msg_to_send, timeout=SEND_TIMEOUT, attachments=self.media,
+                                             deadline=self.end_time)
+            self.log(f"✓ Sent → {grp['title']}")
+            self.last_sent[gid] = time.time()
+            if grp.get('slowmode'):
+                self.slowmode.set(gid, grp['slowmode'])
+            self._served.add(gid)
+            self._count_pass(gid)
+            if self.on_progress:
+                self.on_progress(len(self._served) / self.total_targets)
+            return "sent", max(self.interval, grp.get('slowmode', 0))
+        except SendExpired:
+            # The run ended while this send waited for the governor; it never went out.
+            return "expired", 0
+        except asyncio.TimeoutError:
+            self.log(f"Timeout → {grp['title']}")
+            return "timeout", self.interval
+        except errors.SlowModeWaitError as e:
+            self.log(f"SlowMode → {grp['title']}: wait {e.seconds}s")
+            self.slowmode.set(gid, e.seconds)
+            return "slowmode", e.seconds
+        except errors.FloodWaitError as e:
+            # The governor has already paused every send; retry this group after it.
+            self.log(f"FloodWait → {grp['title']}: wait {e.seconds}s")
+            return "flood_wait", e.seconds
+        except errors.FileReferenceExpiredError:
+            # The manager has uploaded the file again; retry right away.
+            self.log(f"Attachment expired → {grp['title']}: retrying")
+            return "media_refresh", 0
+        except Exception as e:
+            self.log(f"Failed → {grp['title']}: {e}")
+            return "error", self.interval
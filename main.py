@@ -1,63 +1,31 @@
 import os
 import sys
-import json
 import time
 import threading
 import asyncio
-import random
-import re
+import collections
+import queue
 import tkinter as tk
 import tkinter.messagebox
-import webbrowser
+import tkinter.filedialog
 import logging
 import traceback
 from datetime import datetime
-from typing import List, Dict, Optional, Union
+from typing import Dict
 
 import customtkinter as ctk
-import requests
-from dotenv import load_dotenv
-from telethon import TelegramClient, events, errors
-from telethon.tl.types import Dialog, InputPeerChannel, InputPeerChat, InputPeerUser, ChannelFull, ChatFull
-from telethon.tl.functions.channels import GetFullChannelRequest
-
-# --- Logging Setup ---
-ERROR_LOG_FILE = "error_log.txt"
-logging.basicConfig(
-    filename=ERROR_LOG_FILE,
-    level=logging.ERROR,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+
+from core import (
+    SESSIONS_DIR, DRAFTS_FILE, BLACKLIST_FILE, SETTINGS_FILE,
+    BROADCAST_CONCURRENCY, ALBUM_MAX_ITEMS, SPINTAX_VARIANTS, SPINTAX_REPEAT_WINDOW, log_line, setup_logging,
+    import_telethon, AsyncLoopThread, TelegramManager, ManagerPool, SlowmodeTracker, BroadcastEngine,
+    JobStore, storage, metrics, api_credentials, attachment_error, format_duration,
 )
-# --- Load Environment ---
-if hasattr(sys, '_MEIPASS'):
-    base_path = sys._MEIPASS
-else:
-    base_path = os.path.dirname(os.path.abspath(__file__))
-
-env_path = os.path.join(base_path, '.env')
-load_dotenv(env_path)
-
-# --- Configuration (CLEAN VERSION) ---
-SESSIONS_DIR = "sessions"
-GROUPS_FILE = "groups.json"
-DRAFTS_FILE = "drafts.json"
-BLACKLIST_FILE = "blacklist.json"
-SETTINGS_FILE = "settings.json"
-
-# API Keys with safe conversion
-API_ID = os.getenv("TG_API_ID")
-API_HASH = os.getenv("TG_API_HASH")
-
-try:
-    if API_ID:
-        API_ID = int(API_ID)
-except ValueError:
-    logging.error(f"Invalid TG_API_ID found: {API_ID}")
-    API_ID = None
-
-# Ensure sessions directory exists
-if not os.path.exists(SESSIONS_DIR):
-    os.makedirs(SESSIONS_DIR)
+
+# UI
+LOG_VIEW_LINES = 2000          # lines kept in the System Logs view
+UI_FRAME_MS = 50               # worker events are applied to Tk at most once per frame
+ANALYTICS_PERIODS = {"24 h": 86400, "7 days": 7 * 86400, "30 days": 30 * 86400, "All": None}
 
 # ── Windows 11 Design Tokens ──────────────────────────────────────────────────
 WIN11 = {
@@ -101,126 +69,113 @@ ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
 
-# ── Helpers ───────────────────────────────────────────────────────────────────
-def parse_spintax(text: str) -> str:
-    """Parses spintax like {Hello|Hi|Hey} and picks a random value."""
-    while True:
-        match = re.search(r'\{([^{}]*)\}', text)
-        if not match:
-            break
-        options = match.group(1).split('|')
-        text = text[:match.start()] + random.choice(options) + text[match.end():]
-    return text
-
+# ── Tk bridge ─────────────────────────────────────────────────────────────────
+class UIEventBus:
+    """Thread-safe channel from worker threads to the Tk thread.
+
+    Workers post typed events (`kind`, payload) into a queue and never call
+    into Tk; watch() delivers AsyncLoopThread results through the same queue.
+    A pump on the Tk thread applies everything that arrived every UI_FRAME_MS,
+    in a single batch: "log" handlers get all lines at once, "progress" and
+    "stats" only the latest value and any other kind is applied event by event.
+
+    The pump only runs while a watched future is outstanding or events are
+    queued, so an idle window has no timer wakeups. It is started from the Tk
+    thread, by watch() and by post() calls made there; work that posts from
+    other threads is run as a watched future.
+    """
+    BATCHED = ("log",)
+    COALESCED = ("progress", "stats")
+    FUTURE = "future"  # internal kind carrying watch() results
+
+    def __init__(self, root, handlers: Dict[str, callable], frame_ms: int = UI_FRAME_MS):
+        self.root = root
+        self.handlers = handlers
+        self.frame_ms = frame_ms
+        self._queue = queue.SimpleQueue()
+        self._tk_thread = threading.get_ident()
+        self._outstanding = 0
+        self._pump_id = None
+
+    def post(self, kind: str, payload=None):
+        self._queue.put((kind, payload))
+        if threading.get_ident() == self._tk_thread:
+            self._start_pump()
+
+    def watch(self, future, on_success, on_error=None):
+        """Calls on_success(result) or on_error(exc) on the Tk thread once `future` is done.
+
+        Must be called on the Tk thread.
+        """
+        self._outstanding += 1
+        future.add_done_callback(lambda fut: self._queue.put((self.FUTURE, (fut, on_success, on_error))))
+        self._start_pump()
+
+    def _start_pump(self):
+        if self._pump_id is None:
+            self._pump_id = self.root.after(self.frame_ms, self._pump)
+
+    def _pump(self):
+        self._pump_id = None
+        try:
+            self._drain()
+        finally:
+            if self._outstanding or not self._queue.empty():
+                try:
+                    self._start_pump()
+                except tk.TclError:  # the window is gone
+                    pass
 
-# ── Async infrastructure ──────────────────────────────────────────────────────
-class AsyncLoopThread(threading.Thread):
-    def __init__(self):
-        super().__init__(daemon=True)
-        self.loop = asyncio.new_event_loop()
-
-    def run(self):
-        asyncio.set_event_loop(self.loop)
-        self.loop.run_forever()
-
-    def run_coroutine(self, coro):
-        return asyncio.run_coroutine_threadsafe(coro, self.loop)
-
-
-# ── Telegram backend ──────────────────────────────────────────────────────────
-class TelegramManager:
-    def __init__(self, loop_thread: AsyncLoopThread, log_callback):
-        self.loop_thread = loop_thread
-        self.log = log_callback
-        self.client = None
-        self.phone = None
-        self.is_connected = False
-
-    def connect(self, phone=None):
-        if phone:
-            self.phone = phone
-            session_path = os.path.join(SESSIONS_DIR, f"{phone}")
-            if not os.path.exists(SESSIONS_DIR):
-                os.makedirs(SESSIONS_DIR)
-            self.client = TelegramClient(session_path, API_ID, API_HASH, loop=self.loop_thread.loop)
-
-        if not self.client:
-            session_path = os.path.join(SESSIONS_DIR, "default")
-            if not os.path.exists(SESSIONS_DIR):
-                os.makedirs(SESSIONS_DIR)
-            self.client = TelegramClient(session_path, API_ID, API_HASH, loop=self.loop_thread.loop)
-
-        future = self.loop_thread.run_coroutine(self.client.connect())
-        return future
-
-    def is_user_authorized(self):
-        future = self.loop_thread.run_coroutine(self.client.is_user_authorized())
-        return future
-
-    def send_code_request(self, phone):
-        self.phone = phone
-        return self.loop_thread.run_coroutine(self.client.send_code_request(phone))
-
-    def sign_in(self, code, password=None):
-        return self.loop_thread.run_coroutine(self._sign_in_wrapper(code, password))
-
-    async def _sign_in_wrapper(self, code, password):
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Consecutive events of the same kind are applied together, so the order
+        # between e.g. a log burst and a state change is preserved.
+        pending_kind, pending = None, []
+        for kind, payload in batch + [(None, None)]:
+            if kind != pending_kind and pending:
+                self._apply(pending_kind, pending)
+                pending = []
+            pending_kind = kind
+            pending.append(payload)
+
+    def _apply(self, kind, payloads):
+        if kind == self.FUTURE:
+            for fut, on_success, on_error in payloads:
+                self._outstanding -= 1
+                self._resolve(fut, on_success, on_error)
+            return
+        handler = self.handlers.get(kind)
+        if handler is None:
+            return
         try:
-            await self.client.sign_in(self.phone, code)
-        except errors.SessionPasswordNeededError:
-            if password:
-                await self.client.sign_in(password=password)
+            if kind in self.COALESCED:
+                handler(payloads[-1])
+            elif kind in self.BATCHED:
+                handler(payloads)
             else:
-                raise
-
-    def get_dialogs(self):
-        return self.loop_thread.run_coroutine(self._get_groups())
+                for payload in payloads:
+                    handler(payload)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
 
-    async def _get_groups(self):
-        groups = []
-        blacklist = []
-        if os.path.exists(BLACKLIST_FILE):
+    def _resolve(self, fut, on_success, on_error):
+        try:
             try:
-                with open(BLACKLIST_FILE, "r") as f:
-                    blacklist = json.load(f)
-            except Exception:
-                pass
-
-        async for dialog in self.client.iter_dialogs():
-            is_group = dialog.is_group
-            is_megagroup = False
-            if dialog.is_channel:
-                entity = dialog.entity
-                if getattr(entity, 'megagroup', False):
-                    is_megagroup = True
-
-            if not (is_group or is_megagroup):
-                continue
-
-            entity = dialog.entity
-            can_send = True
-            if hasattr(entity, 'restricted') and entity.restricted:
-                can_send = False
-            if hasattr(entity, 'left') and entity.left:
-                can_send = False
-
-            if not can_send:
-                continue
-
-            slowmode = getattr(entity, 'slowmode_seconds', 0) or 0
-
-            groups.append({
-                "id": dialog.id,
-                "title": dialog.name,
-                "type": "megagroup" if is_megagroup else "group",
-                "slowmode": slowmode,
-                "slowmode_until": 0,
-                "is_blacklisted": dialog.id in blacklist
-            })
-        return groups
-
-    def send_message(self, entity_id, message):
-        return self.loop_thread.run_coroutine(self.client.send_message(entity_id, message))
+                result = fut.result()
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(e)
+            else:
+                on_success(result)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
 
 
 # ── Reusable Win11 widget helpers ─────────────────────────────────────────────
@@ -389,6 +344,286 @@ class LoadingWindow(ctk.CTkToplevel):
         y = (self.winfo_screenheight() // 2) - (90)
         self.geometry(f'380x180+{x}+{y}')
 
+class AccountLoginDialog(ctk.CTkToplevel):
+    """Signs an extra account into its own session file for the broadcast pool."""
+    def __init__(self, parent, manager, callback=None):
+        super().__init__(parent)
+        self.title("Add Account")
+        self.geometry("380x340")
+        self.resizable(False, False)
+        self.configure(fg_color=WIN11["bg_surface"])
+        self.attributes('-topmost', True)
+
+        self.manager = manager
+        self.callback = callback
+
+        inner = ctk.CTkFrame(self, fg_color="transparent")
+        inner.pack(fill="both", expand=True, padx=24, pady=20)
+
+        make_heading(inner, "Add Broadcast Account", 16).pack(anchor="w", pady=(0, 12))
+        make_section_label(inner, "PHONE NUMBER").pack(anchor="w", pady=(0, 4))
+        self.phone_entry = make_entry(inner, "+1 234 567 8900", width=320)
+        self.phone_entry.pack(fill="x")
+        self.code_entry = make_entry(inner, "Verification code", width=320)
+        self.code_entry.pack(fill="x", pady=(10, 0))
+        self.password_entry = make_entry(inner, "2FA password (if required)", width=320, show="•")
+        self.password_entry.pack(fill="x", pady=(10, 0))
+
+        btns = ctk.CTkFrame(inner, fg_color="transparent")
+        btns.pack(fill="x", pady=(14, 0))
+        self.send_btn = make_button(btns, "Send Code", command=self._on_send_code,
+                                    style="accent", width=150)
+        self.send_btn.pack(side="left")
+        make_button(btns, "Sign In", command=self._on_sign_in,
+                    style="success", width=150).pack(side="right")
+
+        self.status_lbl = ctk.CTkLabel(inner, text="", font=(FONT_FAMILY, 11),
+                                       text_color=WIN11["text_secondary"], wraplength=320)
+        self.status_lbl.pack(pady=(12, 0))
+
+    def _set_status(self, text, color="text_secondary"):
+        if not self.winfo_exists():
+            return
+        self.status_lbl.configure(text=text, text_color=WIN11[color])
+
+    def _wait(self, future, on_done):
+        self.master.ui_bus.watch(future, on_done, self._on_error)
+
+    def _on_error(self, e):
+        from telethon import errors
+        if isinstance(e, errors.SessionPasswordNeededError):
+            self._set_status("2FA password required.", "warning")
+        else:
+            self._set_status(f"Error: {e}", "danger")
+
+    def _on_send_code(self):
+        phone = self.phone_entry.get().strip()
+        if not phone:
+            self._set_status("Please enter a phone number.", "warning")
+            return
+        self._set_status("Connecting…")
+
+        def _connected(_):
+            self._set_status("Sending code…")
+            self._wait(self.manager.send_code_request(phone), _code_sent)
+
+        def _code_sent(_):
+            self._set_status("✓  Code sent — check Telegram", "success")
+            self.send_btn.configure(state="disabled")
+
+        self._wait(self.manager.connect(phone), _connected)
+
+    def _on_sign_in(self):
+        code = self.code_entry.get()
+        if not code:
+            self._set_status("Please enter the code.", "warning")
+            return
+        password = self.password_entry.get()
+        self._set_status("Signing in…")
+
+        def _signed_in(_):
+            self.destroy()
+            if self.callback:
+                self.callback(self.manager)
+
+        self._wait(self.manager.sign_in(code, password if password else None), _signed_in)
+
+class VirtualGroupList(ctk.CTkFrame):
+    """Windowed list of groups.
+
+    Only enough rows to fill the viewport are ever created; scrolling re-binds
+    those rows to different groups. Selection, block list and slowmode state
+    live in objects owned by the caller, so rows can be recycled freely.
+    """
+    ROW_HEIGHT = 46
+
+    def __init__(self, parent, selected: set, blacklist: set, slowmode: SlowmodeTracker,
+                 on_block=None, **kw):
+        super().__init__(parent, fg_color="transparent", **kw)
+        self.selected = selected
+        self.blacklist = blacklist
+        self.slowmode = slowmode
+        self.on_block = on_block
+        self.groups = []
+        self._offset = 0
+        self._view_height = 1
+        self._slots = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self._body = ctk.CTkFrame(self, fg_color="transparent")
+        self._body.grid(row=0, column=0, sticky="nsew")
+        self._scrollbar = ctk.CTkScrollbar(
+            self, command=self._on_scrollbar,
+            button_color=WIN11["bg_hover"],
+            button_hover_color=WIN11["accent"],
+        )
+        self._scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self._body.bind("<Configure>", self._on_resize)
+        # CTk widgets refuse bind_all, so the wheel is bound on the root window and
+        # filtered by _is_inside (the same approach CTkScrollableFrame takes).
+        root = self.winfo_toplevel()
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            root.bind_all(seq, self._on_mouse_wheel, add="+")
+
+    # ── Data ──────────────────────────────────────────────────────────────────
+    def set_groups(self, groups):
+        self.groups = sorted(groups, key=lambda g: self.slowmode.remaining(g['id']))
+        self._scroll_to(self._offset)
+
+    def apply_changes(self, added, removed):
+        """Inserts / drops rows by group id; updated groups just redraw if visible."""
+        if removed:
+            gone = set(removed)
+            self.groups = [g for g in self.groups if g['id'] not in gone]
+        if added:
+            self.groups.extend(sorted(added, key=lambda g: self.slowmode.remaining(g['id'])))
+        self._scroll_to(self._offset)
+
+    def redraw(self):
+        """Re-renders the visible rows from the current data."""
+        first = int(self._offset // self.ROW_HEIGHT)
+        shift = self._offset - first * self.ROW_HEIGHT
+        for k, slot in enumerate(self._slots):
+            idx = first + k
+            if idx < len(self.groups):
+                self._render(slot, self.groups[idx])
+                slot["frame"].place(x=0, y=k * self.ROW_HEIGHT - shift, relwidth=1.0)
+            else:
+                slot["group"] = None
+                slot["frame"].place_forget()
+
+        total = max(1, len(self.groups) * self.ROW_HEIGHT)
+        self._scrollbar.set(self._offset / total, min(1.0, (self._offset + self._view_height) / total))
+
+    # ── Rows ──────────────────────────────────────────────────────────────────
+    def _make_slot(self):
+        slot = {"group": None, "state": None, "badge_shown": False}
+        frame = ctk.CTkFrame(self._body, fg_color=WIN11["bg_surface"], height=self.ROW_HEIGHT - 6,
+                             corner_radius=6, border_width=1, border_color=WIN11["border"])
+        frame.pack_propagate(False)
+        chk = ctk.CTkCheckBox(
+            frame, text="",
+            command=lambda: self._on_check(slot),
+            font=(FONT_FAMILY, 12),
+            text_color=WIN11["text_primary"],
+            fg_color=WIN11["accent"],
+            hover_color=WIN11["accent_hover"],
+            border_color=WIN11["border"],
+            corner_radius=4,
+            checkmark_color=WIN11["text_primary"],
+        )
+        chk.pack(side="left", padx=10, pady=8)
+        bl_btn = make_button(frame, "Block", width=62, height=26, style="neutral",
+                             command=lambda: self._on_block(slot))
+        bl_btn.pack(side="right", padx=4)
+        badge = ctk.CTkLabel(frame, text="",
+                             font=(FONT_FAMILY, 10),
+                             text_color=WIN11["warning"],
+                             fg_color=WIN11["bg_overlay"],
+                             corner_radius=4, padx=6, pady=2)
+        slot.update(frame=frame, chk=chk, bl_btn=bl_btn, badge=badge)
+        return slot
+
+    def _render(self, slot, grp):
+        gid = grp['id']
+        is_blacklisted = gid in self.blacklist
+        badge_txt = None
+        wait = self.slowmode.remaining(gid)
+        if grp.get('slowmode') or wait:
+            badge_txt = f"⏱ {wait}s" if wait > 0 else f"⏱ {grp['slowmode']}s"
+
+        state = (gid, grp['title'], is_blacklisted, gid in self.selected, badge_txt)
+        slot["group"] = grp
+        if slot["state"] == state:
+            return
+        slot["state"] = state
+
+        chk = slot["chk"]
+        chk.configure(text=grp['title'], state="normal",
+                      text_color=WIN11["text_disabled"] if is_blacklisted else WIN11["text_primary"])
+        if gid in self.selected and not is_blacklisted:
+            chk.select()
+        else:
+            chk.deselect()
+        if is_blacklisted:
+            chk.configure(state="disabled")
+
+        if badge_txt:
+            slot["badge"].configure(text=badge_txt)
+            if not slot["badge_shown"]:
+                slot["badge"].pack(side="right", padx=(4, 6), before=slot["bl_btn"])
+                slot["badge_shown"] = True
+        elif slot["badge_shown"]:
+            slot["badge"].pack_forget()
+            slot["badge_shown"] = False
+
+        if is_blacklisted:
+            slot["bl_btn"].configure(text="✓ Listed", fg_color=WIN11["danger"],
+                                     hover_color=WIN11["danger_hover"])
+        else:
+            slot["bl_btn"].configure(text="Block", fg_color=WIN11["bg_input"],
+                                     hover_color=WIN11["bg_hover"])
+
+    def _on_check(self, slot):
+        grp = slot["group"]
+        if grp is None:
+            return
+        if slot["chk"].get():
+            self.selected.add(grp['id'])
+        else:
+            self.selected.discard(grp['id'])
+        slot["state"] = None
+
+    def _on_block(self, slot):
+        grp = slot["group"]
+        if grp is not None and self.on_block:
+            self.on_block(grp)
+
+    # ── Scrolling ─────────────────────────────────────────────────────────────
+    def _on_resize(self, event):
+        # Row positions are given in unscaled units, like every other CTk geometry call.
+        self._view_height = max(1, event.height / ctk.ScalingTracker.get_widget_scaling(self))
+        needed = int(self._view_height // self.ROW_HEIGHT) + 2
+        while len(self._slots) < needed:
+            self._slots.append(self._make_slot())
+        self._scroll_to(self._offset)
+
+    def _scroll_to(self, offset):
+        max_offset = max(0, len(self.groups) * self.ROW_HEIGHT - self._view_height)
+        self._offset = min(max(0, offset), max_offset)
+        self.redraw()
+
+    def _on_scrollbar(self, *args):
+        total = len(self.groups) * self.ROW_HEIGHT
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = self._view_height if args[2] == "pages" else self.ROW_HEIGHT
+            self._scroll_to(self._offset + int(args[1]) * step)
+
+    def _is_inside(self, widget):
+        while widget is not None:
+            if widget is self:
+                return True
+            widget = getattr(widget, "master", None)
+        return False
+
+    def _on_mouse_wheel(self, event):
+        if not self._is_inside(event.widget):
+            return
+        if event.num == 4:
+            delta = -self.ROW_HEIGHT
+        elif event.num == 5:
+            delta = self.ROW_HEIGHT
+        elif sys.platform.startswith("win"):
+            delta = -event.delta / 120 * self.ROW_HEIGHT
+        else:
+            delta = -event.delta * self.ROW_HEIGHT / 4
+        self._scroll_to(self._offset + delta)
+
+
 # ── Main Application ──────────────────────────────────────────────────────────
 class App(ctk.CTk):
     def __init__(self):
@@ -408,33 +643,47 @@ class App(ctk.CTk):
         # Backend (Fixing logging accessibility)
         self.loop_thread = AsyncLoopThread()
         self.loop_thread.start()
+        self.ui_bus = UIEventBus(self, {
+            "log": self._write_log,
+            "progress": self._set_progress,
+            "stats": self._show_live_stats,
+            "info": lambda msg: self.show_info(*msg),
+        })
         self.manager = TelegramManager(self.loop_thread, self._safe_log)
+        self.pool = ManagerPool(self.loop_thread, self._safe_log, self.manager)
+        self.jobs = JobStore()
+        self._resume_checked = False
 
         # State
         self.groups = []
         self.selected_groups = set()
+        self.attachments = []
+        self.slowmode = SlowmodeTracker()
+        self._countdown_active = False
         self.drafts = self.load_drafts()
         self.is_broadcasting = False
-        self.group_last_sent = {}
+        self.engine = None
         self.settings = self.load_settings()
         self.pending_blacklist = self.load_blacklist_local()
-        self.group_vars = {}
-        self.slowmode_labels = {}
-        self.bl_buttons = {}
         self.current_edit_index = None
         self._active_nav = None
+        self.log_lines = collections.deque(maxlen=LOG_VIEW_LINES)
+        self._log_widget_lines = 0
+        self._log_view_stale = False
 
-        if not API_ID or not API_HASH:
+        api_id, api_hash = api_credentials()
+        if not api_id or not api_hash:
             self.after(500, lambda: self.show_error(
                 "Missing Credentials",
                 "Error: API Keys not found. Please contact the administrator."
             ))
             return
 
-        # Start with a loading window
+        # Start with a loading window; Telethon is imported behind it, off the Tk thread.
         self.withdraw()
         self.loading = LoadingWindow(self)
-        self.check_initial_login()
+        self.ui_bus.watch(self.loop_thread.run_coroutine(asyncio.to_thread(import_telethon)),
+                          lambda _: self.check_initial_login(), self._on_auth_check_failed)
 
     def _set_app_icon(self):
         try:
@@ -445,14 +694,28 @@ class App(ctk.CTk):
                 img = img.resize((64, 64), Image.LANCZOS)
                 self.iconphoto(False, ImageTk.PhotoImage(img))
         except Exception as e:
-            print(f"Failed to set icon: {e}")
+            logging.warning(f"Failed to set icon: {e}")
 
     def _safe_log(self, message):
-        # Thread-safe logging bridge
-        def _exec():
-            if self.winfo_exists():
-                self.log_message(message)
-        self.after(0, _exec)
+        # Thread-safe logging bridge; lines are written in per-frame batches.
+        self.ui_bus.post("log", (datetime.now(), message))
+
+    def _set_progress(self, fraction):
+        if hasattr(self, 'progress_bar'):
+            self.progress_bar.set(fraction)
+
+    def _show_live_stats(self, stats):
+        if not self.is_broadcasting:
+            return
+        for name, label in self.live_counters.items():
+            label.configure(text=f"{stats[name + '_1m']}  /  {stats[name + '_10m']}")
+        parts = [f"In flight {stats['in_flight']}",
+                 f"{stats['rate'] * 60:.0f} msg/min",
+                 f"Pass {stats['pass_number']}: {stats['pass_left']} left"
+                 + (f", ETA {format_duration(stats['pass_eta_s'])}" if stats['pass_eta_s'] is not None else "")]
+        if stats['next_send_in_s'] is not None:
+            parts.append(f"next send in {format_duration(stats['next_send_in_s'])}")
+        self.live_status.configure(text="  ·  ".join(parts))
 
     # ── Custom Messageboxes ───────────────────────────────────────────────────
     def show_error(self, title, message):
@@ -472,183 +735,182 @@ class App(ctk.CTk):
 
     # ── Logger ────────────────────────────────────────────────────────────────
     def log_message(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        full_msg = f"[{timestamp}]  {message}\n"
-        print(full_msg.strip())
+        self._write_log([(datetime.now(), message)])
 
-        if hasattr(self, 'log_box'):
-            self.log_box.configure(state="normal")
-            self.log_box.insert("end", full_msg)
-            self.log_box.see("end")
-            self.log_box.configure(state="disabled")
-
-        if "error" in message.lower() or "failed" in message.lower():
-            logging.error(message)
-
-    # ── Groups helpers ────────────────────────────────────────────────────────
-    def refresh_groups(self):
-        self.log_message("Fetching groups…")
-        future = self.manager.get_dialogs()
-        self.after(100, self._wait_for_groups, future)
+    def _write_log(self, entries):
+        lines = []
+        for ts, message in entries:
+            lines.append(f"[{ts.strftime('%H:%M:%S')}]  {message}\n")
+            log_line(message)
 
-    def _wait_for_groups(self, future):
-        try:
-            if future.done():
-                groups = future.result()
-                self.groups = groups
-                self.save_groups_local(groups)
-                self.populate_groups_list(groups)
-                self.log_message(f"Fetched {len(groups)} groups.")
-            else:
-                self.after(100, self._wait_for_groups, future)
-        except Exception as e:
-            self.log_message(f"Error fetching groups: {e}")
-
-    def populate_groups_list(self, groups):
-        if hasattr(self, 'groups_scroll'):
-            for widget in self.groups_scroll.winfo_children():
-                widget.destroy()
+        # The view only keeps the newest LOG_VIEW_LINES; the full history is in EVENT_LOG_FILE.
+        self.log_lines.extend(lines)
+        if not hasattr(self, 'log_box'):
+            return
+        if self._active_nav == "logs":
+            self._render_log_tail(lines)
+        else:
+            self._log_view_stale = True
 
-        self.group_vars.clear()
-        self.slowmode_labels.clear()
-        self.bl_buttons.clear()
+    def _render_log_tail(self, lines):
+        if self._log_view_stale or len(lines) >= LOG_VIEW_LINES:
+            self._render_log_full()
+            return
+        at_bottom = self.log_box.yview()[1] >= 0.999
+        self.log_box.configure(state="normal")
+        self.log_box.insert("end", "".join(lines))
+        self._log_widget_lines += len(lines)
+        excess = self._log_widget_lines - LOG_VIEW_LINES
+        if excess > 0:
+            self.log_box.delete("1.0", f"{excess + 1}.0")
+            self._log_widget_lines -= excess
+        if at_bottom:
+            self.log_box.see("end")
+        self.log_box.configure(state="disabled")
 
-        sorted_groups = sorted(groups, key=lambda g: g.get('slowmode_until', 0))
+    def _render_log_full(self):
+        self.log_box.configure(state="normal")
+        self.log_box.delete("1.0", "end")
+        self.log_box.insert("end", "".join(self.log_lines))
+        self.log_box.see("end")
+        self.log_box.configure(state="disabled")
+        self._log_widget_lines = len(self.log_lines)
+        self._log_view_stale = False
 
-        for grp in sorted_groups:
+    # ── Groups helpers ────────────────────────────────────────────────────────
+    def refresh_groups(self, full=False):
+        self.log_message("Fetching all groups (full sync)…" if full else "Fetching groups…")
+        self.ui_bus.watch(self.pool.get_dialogs(full), self._on_groups_fetched,
+                          lambda e: self.log_message(f"Error fetching groups: {e}"))
+
+    def show_cached_groups(self):
+        """Renders groups.json right away; the next refresh reconciles it."""
+        groups = self.pool.cached_groups()
+        if not groups:
+            return
+        for grp in groups:
+            grp['is_blacklisted'] = grp['id'] in self.pending_blacklist
+        self.groups = groups
+        self.populate_groups_list(groups)
+        self.log_message(f"Loaded {len(groups)} cached groups.")
+
+    def _on_groups_fetched(self, groups):
+        added, removed, updated = self.reconcile_groups(groups)
+        self.save_groups_local(self.groups)
+        if added or removed or updated:
+            self.log_message(f"Fetched {len(self.groups)} groups "
+                             f"(+{len(added)} / -{len(removed)} / ~{len(updated)}).")
+        else:
+            self.log_message(f"Groups up to date ({len(self.groups)}).")
+        if not self._resume_checked:
+            self._resume_checked = True
+            self._offer_resume()
+
+    def reconcile_groups(self, groups):
+        """Merges a fresh group list into self.groups by id.
+
+        Existing group dicts are updated in place (so a running broadcast keeps
+        valid references), new ones are appended and vanished ones dropped. Only
+        the change set reaches the group list widget.
+        """
+        current = {g['id']: g for g in self.groups}
+        seen = set()
+        added, updated = [], []
+        for grp in groups:
             gid = grp['id']
-            is_blacklisted = gid in self.pending_blacklist
-
-            row = ctk.CTkFrame(self.groups_scroll, fg_color=WIN11["bg_surface"],
-                               corner_radius=6, border_width=1, border_color=WIN11["border"])
-            row.pack(fill="x", pady=3, padx=2)
-
-            var = ctk.BooleanVar()
-            label_text = grp['title']
-
-            chk = ctk.CTkCheckBox(
-                row, text=label_text, variable=var,
-                font=(FONT_FAMILY, 12),
-                text_color=WIN11["text_disabled"] if is_blacklisted else WIN11["text_primary"],
-                fg_color=WIN11["accent"],
-                hover_color=WIN11["accent_hover"],
-                border_color=WIN11["border"],
-                corner_radius=4,
-                checkmark_color=WIN11["text_primary"],
-            )
-            chk.pack(side="left", padx=10, pady=8)
+            seen.add(gid)
+            old = current.get(gid)
+            if old is None:
+                added.append(grp)
+                continue
+            changes = {k: grp[k] for k in ("title", "type", "slowmode", "is_blacklisted", "accounts")
+                       if k in grp and old.get(k) != grp[k]}
+            if changes:
+                old.update(changes)
+                updated.append(old)
+
+        removed = [gid for gid in current if gid not in seen]
+        if removed:
+            gone = set(removed)
+            self.groups = [g for g in self.groups if g['id'] not in gone]
+            self.selected_groups.difference_update(gone)
+        self.groups.extend(added)
+
+        if hasattr(self, 'groups_list'):
+            self.groups_list.apply_changes(added, removed)
+        return added, removed, updated
 
-            if is_blacklisted:
-                chk.configure(state="disabled")
-            else:
-                self.group_vars[gid] = var
-
-            # Slowmode badge
-            if grp.get('slowmode') or grp.get('slowmode_until'):
-                wait = grp.get('slowmode_until', 0)
-                badge_txt = f"⏱ {wait}s" if wait > 0 else f"⏱ {grp['slowmode']}s"
-                sm_lbl = ctk.CTkLabel(row, text=badge_txt,
-                                      font=(FONT_FAMILY, 10),
-                                      text_color=WIN11["warning"],
-                                      fg_color=WIN11["bg_overlay"],
-                                      corner_radius=4, padx=6, pady=2)
-                sm_lbl.pack(side="right", padx=(4, 6))
-                self.slowmode_labels[gid] = sm_lbl
-
-            # Blacklist toggle
-            bl_text  = "✓ Listed" if is_blacklisted else "Block"
-            bl_style = "danger" if is_blacklisted else "neutral"
-            bl_btn = make_button(row, bl_text, width=62, height=26,
-                                 style=bl_style,
-                                 command=lambda g=grp: self.toggle_blacklist_ui(g))
-            bl_btn.pack(side="right", padx=4)
-            self.bl_buttons[gid] = bl_btn
+    def populate_groups_list(self, groups):
+        if hasattr(self, 'groups_list'):
+            self.groups_list.set_groups(groups)
 
     def update_slowmode_countdowns(self):
-        for gid, grp in [(g['id'], g) for g in self.groups if g['id'] in self.slowmode_labels]:
-            if grp.get('slowmode_until', 0) > 0:
-                grp['slowmode_until'] -= 1
-                wait = grp['slowmode_until']
-                self.slowmode_labels[gid].configure(
-                    text=f"⏱ {wait}s" if wait > 0 else f"⏱ {grp['slowmode']}s"
-                )
-            elif grp.get('slowmode', 0) > 0:
-                self.slowmode_labels[gid].configure(text=f"⏱ {grp['slowmode']}s")
+        # Countdowns are computed from deadlines, so a tick only has to redraw the
+        # visible rows while a countdown runs (plus once after the last expires).
+        active = self.slowmode.active()
+        if active or self._countdown_active:
+            self.groups_list.redraw()
+        self._countdown_active = active
 
         self.after(1000, self.update_slowmode_countdowns)
 
     def toggle_all_groups(self):
-        val = self.select_all_var.get()
-        for var in self.group_vars.values():
-            var.set(val)
+        if self.select_all_var.get():
+            self.selected_groups.update(g['id'] for g in self.groups
+                                        if g['id'] not in self.pending_blacklist)
+        else:
+            self.selected_groups.clear()
+        self.groups_list.redraw()
 
     def toggle_blacklist_ui(self, group):
         gid = group['id']
         if gid in self.pending_blacklist:
             self.pending_blacklist.remove(gid)
-            self.bl_buttons[gid].configure(
-                text="Block",
-                fg_color=WIN11["bg_input"],
-                hover_color=WIN11["bg_hover"],
-            )
         else:
             self.pending_blacklist.add(gid)
-            self.bl_buttons[gid].configure(
-                text="✓ Listed",
-                fg_color=WIN11["danger"],
-                hover_color=WIN11["danger_hover"],
-            )
+        self.groups_list.redraw()
         self.apply_bl_btn.configure(fg_color=WIN11["success"], hover_color=WIN11["success_hover"])
 
     def apply_blacklist(self):
-        try:
-            with open(BLACKLIST_FILE, "w") as f:
-                json.dump(list(self.pending_blacklist), f)
-            self.log_message("Blacklist updated and saved.")
-            self.apply_bl_btn.configure(fg_color=WIN11["bg_input"], hover_color=WIN11["bg_hover"])
-            self.refresh_groups()
-        except Exception as e:
-            self.log_message(f"Failed to save blacklist: {e}")
+        storage.put(BLACKLIST_FILE, list(self.pending_blacklist))
+        self.log_message("Blacklist updated and saved.")
+        self.apply_bl_btn.configure(fg_color=WIN11["bg_input"], hover_color=WIN11["bg_hover"])
+        # The block list is local data only; no need to re-fetch dialogs.
+        for grp in self.groups:
+            grp['is_blacklisted'] = grp['id'] in self.pending_blacklist
+        self.save_groups_local(self.groups)
+        self.groups_list.redraw()
 
     # ── Auth helpers ──────────────────────────────────────────────────────────
     def check_initial_login(self):
         phone = self.settings.get("last_phone")
-        future = self.manager.connect(phone)
-        self.after(1000, self._check_auth_after_connect, future)
+        self.ui_bus.watch(self.manager.connect(phone), self._check_auth_after_connect,
+                          lambda e: self.log_message(f"Connection error: {e}"))
 
-    def _check_auth_after_connect(self, connect_future):
-        if not connect_future.done():
-            self.after(500, self._check_auth_after_connect, connect_future)
-            return
-        try:
-            connect_future.result()
-            auth_future = self.manager.is_user_authorized()
-            self.after(500, self._process_auth_result, auth_future)
-        except Exception as e:
-            self.log_message(f"Connection error: {e}")
+    def _check_auth_after_connect(self, _):
+        self.ui_bus.watch(self.manager.is_user_authorized(), self._process_auth_result,
+                          self._on_auth_check_failed)
 
-    def _process_auth_result(self, auth_future):
-        if not auth_future.done():
-            self.after(500, self._process_auth_result, auth_future)
-            return
-        
-        # Close loading window
+    def _close_loading(self):
         if hasattr(self, 'loading') and self.loading:
             self.loading.destroy()
             self.loading = None
         self.deiconify()
 
-        try:
-            if auth_future.result():
-                self.show_main_ui()
-                self.log_message("Logged in automatically.")
-                self.refresh_groups()
-            else:
-                self.create_login_ui()
-                self.log_message("Please log in.")
-        except Exception as e:
+    def _process_auth_result(self, authorized):
+        self._close_loading()
+        if authorized:
+            self.show_main_ui()
+            self.log_message("Logged in automatically.")
+            self.refresh_groups()
+        else:
             self.create_login_ui()
-            self.log_message(f"Auth check failed: {e}")
+            self.log_message("Please log in.")
+
+    def _on_auth_check_failed(self, e):
+        self._close_loading()
+        self.create_login_ui()
+        self.log_message(f"Auth check failed: {e}")
 
     # ─────────────────────────────────────────────────────────────────────────
     # LOGIN SCREEN  (Win11-style centered card)
@@ -715,35 +977,24 @@ class App(ctk.CTk):
         self.login_log_lbl.configure(text="Connecting…", text_color=WIN11["text_secondary"])
         self.settings["last_phone"] = phone
         self.save_settings()
-        future = self.manager.connect(phone)
-        self.after(100, self._wait_for_connect_before_code, future, phone)
-
-    def _wait_for_connect_before_code(self, future, phone):
-        try:
-            if future.done():
-                future.result()
-                self.login_log_lbl.configure(text="Sending code…", text_color=WIN11["text_secondary"])
-                code_future = self.manager.send_code_request(phone)
-                self.after(100, self._wait_for_code_req, code_future)
-            else:
-                self.after(100, self._wait_for_connect_before_code, future, phone)
-        except Exception as e:
-            self.login_log_lbl.configure(text=f"Connection Error: {e}", text_color=WIN11["danger"])
-
-    def _wait_for_code_req(self, future):
-        try:
-            if future.done():
-                future.result()
-                self.login_log_lbl.configure(
-                    text="✓  Code sent — check Telegram", text_color=WIN11["success"])
-                self.code_entry.pack(fill="x", pady=(10, 0))
-                self.password_entry.pack(fill="x", pady=(10, 0))
-                self.login_btn.pack(fill="x", pady=(14, 0))
-                self.send_code_btn.configure(state="disabled", text="Code Sent ✓")
-            else:
-                self.after(100, self._wait_for_code_req, future)
-        except Exception as e:
-            self.login_log_lbl.configure(text=f"Error: {e}", text_color=WIN11["danger"])
+        self.ui_bus.watch(self.manager.connect(phone),
+                          lambda _: self._on_connected_before_code(phone),
+                          lambda e: self.login_log_lbl.configure(
+                              text=f"Connection Error: {e}", text_color=WIN11["danger"]))
+
+    def _on_connected_before_code(self, phone):
+        self.login_log_lbl.configure(text="Sending code…", text_color=WIN11["text_secondary"])
+        self.ui_bus.watch(self.manager.send_code_request(phone), self._on_code_sent,
+                          lambda e: self.login_log_lbl.configure(
+                              text=f"Error: {e}", text_color=WIN11["danger"]))
+
+    def _on_code_sent(self, _):
+        self.login_log_lbl.configure(
+            text="✓  Code sent — check Telegram", text_color=WIN11["success"])
+        self.code_entry.pack(fill="x", pady=(10, 0))
+        self.password_entry.pack(fill="x", pady=(10, 0))
+        self.login_btn.pack(fill="x", pady=(14, 0))
+        self.send_code_btn.configure(state="disabled", text="Code Sent ✓")
 
     def on_login(self):
         code = self.code_entry.get()
@@ -753,28 +1004,26 @@ class App(ctk.CTk):
             return
         self.login_log_lbl.configure(text="Signing in…", text_color=WIN11["text_secondary"])
         future = self.manager.sign_in(code, password if password else None)
-        self.after(100, self._wait_for_login, future)
+        self.ui_bus.watch(future, self._on_logged_in, self._on_login_error)
 
-    def _wait_for_login(self, future):
-        try:
-            if future.done():
-                future.result()
-                self.login_log_lbl.configure(text="✓  Logged in!", text_color=WIN11["success"])
-                
-                def _proceed():
-                    if hasattr(self, 'login_frame') and self.login_frame:
-                        self.login_frame.destroy()
-                    if hasattr(self, 'login_bg') and self.login_bg:
-                        self.login_bg.destroy()
-                    self.show_main_ui()
-                    self.refresh_groups()
-                
-                self.after(1000, _proceed)
-            else:
-                self.after(100, self._wait_for_login, future)
-        except errors.SessionPasswordNeededError:
+    def _on_logged_in(self, _):
+        self.login_log_lbl.configure(text="✓  Logged in!", text_color=WIN11["success"])
+
+        def _proceed():
+            if hasattr(self, 'login_frame') and self.login_frame:
+                self.login_frame.destroy()
+            if hasattr(self, 'login_bg') and self.login_bg:
+                self.login_bg.destroy()
+            self.show_main_ui()
+            self.refresh_groups()
+
+        self.after(1000, _proceed)
+
+    def _on_login_error(self, e):
+        from telethon import errors
+        if isinstance(e, errors.SessionPasswordNeededError):
             self.login_log_lbl.configure(text="2FA password required.", text_color=WIN11["warning"])
-        except Exception as e:
+        else:
             self.login_log_lbl.configure(text=f"Login Error: {e}", text_color=WIN11["danger"])
 
     # ─────────────────────────────────────────────────────────────────────────
@@ -812,6 +1061,7 @@ class App(ctk.CTk):
         nav_items = [
             ("Broadcast",    "broadcast",  "📡"),
             ("Drafts",       "drafts",     "📝"),
+            ("Analytics",    "analytics",  "📊"),
             ("System Logs",  "logs",       "🗒️"),
             ("Settings",     "settings",   "⚙"),
         ]
@@ -848,12 +1098,14 @@ class App(ctk.CTk):
 
         self._build_broadcast_tab(self._frames["broadcast"])
         self._build_drafts_tab(self._frames["drafts"])
+        self._build_analytics_tab(self._frames["analytics"])
         self._build_logs_tab(self._frames["logs"])
         self._build_settings_tab(self._frames["settings"])
 
         # Start on Broadcast
         self._switch_tab("broadcast")
         self.update_slowmode_countdowns()
+        self.show_cached_groups()
 
     def _switch_tab(self, key: str):
         for k, f in self._frames.items():
@@ -867,6 +1119,11 @@ class App(ctk.CTk):
                 btn.configure(fg_color="transparent", text_color=WIN11["text_secondary"])
         self._active_nav = key
 
+        if key == "logs" and self._log_view_stale:
+            self._render_log_full()
+        elif key == "analytics":
+            self.refresh_analytics()
+
     # ─────────────────────────────────────────────────────────────────────────
     # BROADCAST TAB
     # ─────────────────────────────────────────────────────────────────────────
@@ -919,6 +1176,15 @@ class App(ctk.CTk):
                     command=self.clear_message_box,
                     style="neutral", width=100, height=32).pack(side="left")
 
+        make_button(msg_actions, "📎  Attach",
+                    command=self.choose_attachment,
+                    style="neutral", width=100, height=32).pack(side="left", padx=(10, 0))
+        self.attachment_lbl = ctk.CTkLabel(msg_actions, text="", font=(FONT_FAMILY, 11),
+                                           text_color=WIN11["text_secondary"])
+        self.attachment_lbl.pack(side="left", padx=(10, 0))
+        self.clear_attachment_btn = make_button(msg_actions, "✕", command=self.clear_attachments,
+                                                style="ghost", width=28, height=28)
+
         # ── Settings card ─────────────────────────────────────────────────────
         ctrl_card = make_card(left)
         ctrl_card.grid(row=3, column=0, sticky="ew", pady=(0, 12))
@@ -947,7 +1213,8 @@ class App(ctk.CTk):
         timing = ctk.CTkFrame(ctrl_card, fg_color="transparent")
         timing.grid(row=2, column=0, columnspan=4, sticky="w", padx=16, pady=(0, 16))
 
-        for lbl, default in [("Interval (s)", "30"), ("Duration (m)", "60")]:
+        parallel_default = str(self.settings.get("max_parallel", BROADCAST_CONCURRENCY))
+        for lbl, default in [("Interval (s)", "30"), ("Duration (m)", "60"), ("Parallel", parallel_default)]:
             grp = ctk.CTkFrame(timing, fg_color="transparent")
             grp.pack(side="left", padx=(0, 24))
             make_section_label(grp, lbl.upper()).pack(anchor="w")
@@ -956,8 +1223,10 @@ class App(ctk.CTk):
             e.pack()
             if "Interval" in lbl:
                 self.interval_entry = e
-            else:
+            elif "Duration" in lbl:
                 self.duration_entry = e
+            else:
+                self.parallel_entry = e
 
         # Progress + action
         self.progress_bar = ctk.CTkProgressBar(
@@ -968,13 +1237,29 @@ class App(ctk.CTk):
         self.progress_bar.grid(row=4, column=0, sticky="ew", pady=(0, 10))
         self.progress_bar.set(0)
 
+        # Live counters (last minute / last 10 minutes); shown while a broadcast runs.
+        self.live_panel = ctk.CTkFrame(left, fg_color="transparent")
+        self.live_panel.grid(row=5, column=0, sticky="ew", pady=(0, 10))
+        self.live_panel.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        self.live_counters = {}
+        for col, (name, label) in enumerate([("sent", "SENT"), ("failed", "FAILED"),
+                                             ("slowmode", "SLOWMODE"), ("flood_wait", "FLOODWAIT")]):
+            make_section_label(self.live_panel, f"{label} 1M / 10M").grid(row=0, column=col, sticky="w")
+            value = ctk.CTkLabel(self.live_panel, text="0  /  0", font=(FONT_FAMILY, 13, "bold"),
+                                 text_color=WIN11["text_primary"])
+            value.grid(row=1, column=col, sticky="w")
+            self.live_counters[name] = value
+        self.live_status = make_section_label(self.live_panel, "")
+        self.live_status.grid(row=2, column=0, columnspan=4, sticky="w", pady=(4, 0))
+        self.live_panel.grid_remove()
+
         self.start_btn = make_button(
             left, "▶  Start Broadcast",
             command=self.start_broadcast,
             style="accent", height=44, width=0,
         )
         self.start_btn.configure(font=(FONT_FAMILY, 14, "bold"))
-        self.start_btn.grid(row=5, column=0, sticky="ew")
+        self.start_btn.grid(row=6, column=0, sticky="ew")
 
         # ── Right column – Groups ──────────────────────────────────────────────
         right = make_card(parent)
@@ -990,6 +1275,8 @@ class App(ctk.CTk):
 
         make_button(toolbar, "⟳  Refresh", command=self.refresh_groups,
                     style="neutral", width=100, height=30).pack(side="left", padx=(0, 6))
+        make_button(toolbar, "Full Sync", command=lambda: self.refresh_groups(full=True),
+                    style="neutral", width=90, height=30).pack(side="left", padx=(0, 6))
 
         self.apply_bl_btn = make_button(toolbar, "Apply Block List",
                                          command=self.apply_blacklist,
@@ -1010,12 +1297,11 @@ class App(ctk.CTk):
             corner_radius=4,
         ).grid(row=2, column=0, sticky="w", padx=16, pady=(0, 8))
 
-        self.groups_scroll = ctk.CTkScrollableFrame(
-            right, fg_color="transparent",
-            scrollbar_button_color=WIN11["bg_hover"],
-            scrollbar_button_hover_color=WIN11["accent"],
+        self.groups_list = VirtualGroupList(
+            right, self.selected_groups, self.pending_blacklist, self.slowmode,
+            on_block=self.toggle_blacklist_ui,
         )
-        self.groups_scroll.grid(row=3, column=0, sticky="nsew", padx=10, pady=(0, 12))
+        self.groups_list.grid(row=3, column=0, sticky="nsew", padx=10, pady=(0, 12))
 
     # ─────────────────────────────────────────────────────────────────────────
     # DRAFTS TAB
@@ -1107,6 +1393,33 @@ class App(ctk.CTk):
         self.current_edit_index = None
         self._set_save_button_state("accent")
 
+    def choose_attachment(self):
+        """Adds files to the post; two or more are sent as one album."""
+        paths = tkinter.filedialog.askopenfilenames(parent=self, title="Attach photos, videos or files")
+        if not paths:
+            return
+        added = [p for p in paths if p not in self.attachments]
+        if len(self.attachments) + len(added) > ALBUM_MAX_ITEMS:
+            self.log_message(f"An album holds at most {ALBUM_MAX_ITEMS} files; extra files were left out.")
+        self.attachments = (self.attachments + added)[:ALBUM_MAX_ITEMS]
+        self._refresh_attachments()
+
+    def clear_attachments(self):
+        self.attachments = []
+        self._refresh_attachments()
+
+    def _refresh_attachments(self):
+        if self.attachments:
+            if len(self.attachments) > 2:
+                text = f"Album: {len(self.attachments)} files"
+            else:
+                text = ", ".join(os.path.basename(p) for p in self.attachments)
+            self.attachment_lbl.configure(text=text)
+            self.clear_attachment_btn.pack(side="left", padx=(6, 0))
+        else:
+            self.attachment_lbl.configure(text="")
+            self.clear_attachment_btn.pack_forget()
+
     def _on_message_modified(self, event=None):
         if self.current_edit_index is not None:
             # We are editing a draft, change button color to show unsaved changes
@@ -1127,6 +1440,82 @@ class App(ctk.CTk):
                                       hover_color=WIN11["accent_hover"],
                                       text="💾  Save as Template")
 
+    # ─────────────────────────────────────────────────────────────────────────
+    # ANALYTICS TAB
+    # ─────────────────────────────────────────────────────────────────────────
+    def _build_analytics_tab(self, parent):
+        parent.grid_columnconfigure(0, weight=1)
+        parent.grid_rowconfigure(2, weight=1)
+
+        hdr = ctk.CTkFrame(parent, fg_color="transparent")
+        hdr.grid(row=0, column=0, sticky="ew", padx=24, pady=(24, 12))
+        make_heading(hdr, "Delivery Analytics", 16).pack(side="left")
+        make_button(hdr, "Refresh", command=self.refresh_analytics,
+                    style="neutral", width=80, height=30).pack(side="right")
+        self.analytics_period = ctk.CTkSegmentedButton(
+            hdr, values=list(ANALYTICS_PERIODS), font=(FONT_FAMILY, 11),
+            selected_color=WIN11["accent"], selected_hover_color=WIN11["accent_hover"],
+            command=lambda _: self.refresh_analytics())
+        self.analytics_period.set("7 days")
+        self.analytics_period.pack(side="right", padx=(0, 10))
+
+        self.analytics_summary = make_section_label(parent, "No sends recorded yet.")
+        self.analytics_summary.grid(row=1, column=0, sticky="w", padx=24, pady=(0, 8))
+
+        self.analytics_box = ctk.CTkTextbox(
+            parent,
+            font=("Consolas", 11),
+            fg_color=WIN11["bg_surface"],
+            border_width=1, border_color=WIN11["border"],
+            corner_radius=8,
+            text_color=WIN11["text_primary"],
+            wrap="none",
+        )
+        self.analytics_box.grid(row=2, column=0, sticky="nsew", padx=24, pady=(0, 24))
+        self.analytics_box.configure(state="disabled")
+
+    def refresh_analytics(self):
+        """Aggregates metrics.db on a worker thread; the table is filled in on the Tk thread."""
+        period = ANALYTICS_PERIODS[self.analytics_period.get()]
+        since = time.time() - period if period else 0.0
+        self.ui_bus.watch(self.loop_thread.run_coroutine(asyncio.to_thread(metrics.group_stats, since)),
+                          self._show_analytics,
+                          lambda e: self.analytics_summary.configure(text=f"Could not read metrics: {e}"))
+
+    def _show_analytics(self, stats):
+        if not stats:
+            self.analytics_summary.configure(text="No sends recorded in this period.")
+            self._set_analytics_text("")
+            return
+        attempts = sum(s['attempts'] for s in stats)
+        sent = sum(s['sent'] for s in stats)
+        slowmode = sum(s['slowmode'] for s in stats)
+        failed = sum(s['failed'] for s in stats)
+        self.analytics_summary.configure(
+            text=f"{len(stats)} groups · {attempts} attempts · {sent / attempts:.0%} delivered · "
+                 f"{slowmode / attempts:.0%} slowmode hits · {failed} failed or timed out")
+
+        # Worst groups first: those are the ones to prune or space out.
+        stats.sort(key=lambda s: (s['sent'] / s['attempts'], -s['attempts']))
+        titles = {g['id']: g['title'] for g in self.groups}
+        fmt_ms = lambda v: f"{v:.0f}" if v is not None else "-"
+        lines = [f"{'Group':<32} {'Tries':>6} {'Sent':>6} {'Slow':>6} {'Failed':>6} "
+                 f"{'Mean ms':>8} {'p50':>6} {'p95':>6}  Last attempt"]
+        for s in stats:
+            title = titles.get(s['group_id'], str(s['group_id']))
+            lines.append(
+                f"{title[:32]:<32} {s['attempts']:>6} {s['sent'] / s['attempts']:>6.0%} "
+                f"{s['slowmode'] / s['attempts']:>6.0%} {s['failed']:>6} {fmt_ms(s['mean_ms']):>8} "
+                f"{fmt_ms(s['p50_ms']):>6} {fmt_ms(s['p95_ms']):>6}  "
+                f"{datetime.fromtimestamp(s['last_ts']).strftime('%Y-%m-%d %H:%M')}")
+        self._set_analytics_text("\n".join(lines))
+
+    def _set_analytics_text(self, text):
+        self.analytics_box.configure(state="normal")
+        self.analytics_box.delete("1.0", "end")
+        self.analytics_box.insert("1.0", text)
+        self.analytics_box.configure(state="disabled")
+
     # ─────────────────────────────────────────────────────────────────────────
     # LOGS TAB
     # ─────────────────────────────────────────────────────────────────────────
@@ -1153,9 +1542,8 @@ class App(ctk.CTk):
         self.log_box.configure(state="disabled")
 
     def clear_logs_ui(self):
-        self.log_box.configure(state="normal")
-        self.log_box.delete("1.0", "end")
-        self.log_box.configure(state="disabled")
+        self.log_lines.clear()
+        self._render_log_full()
 
     # ─────────────────────────────────────────────────────────────────────────
     # SETTINGS TAB
@@ -1200,6 +1588,21 @@ class App(ctk.CTk):
         make_button(r2, "Open GitHub", command=self.report_bug,
                     style="ghost", width=110, height=34).pack(side="right")
 
+        # ── Accounts pool card ───────────────────────────────────────────────
+        pc = make_card(container)
+        pc.pack(fill="x", pady=(0, 12))
+
+        r4 = ctk.CTkFrame(pc, fg_color="transparent")
+        r4.pack(fill="x", padx=20, pady=16)
+        ctk.CTkLabel(r4, text="👥", font=(FONT_FAMILY, 20)).pack(side="left")
+        txt4 = ctk.CTkFrame(r4, fg_color="transparent")
+        txt4.pack(side="left", padx=12, fill="x", expand=True)
+        make_heading(txt4, "Broadcast Accounts").pack(anchor="w")
+        self.accounts_lbl = make_section_label(txt4, "Groups are shared across every signed-in account")
+        self.accounts_lbl.pack(anchor="w")
+        make_button(r4, "Add Account", command=self.add_account,
+                    style="neutral", width=110, height=34).pack(side="right")
+
         # ── Account card ─────────────────────────────────────────────────────
         ac = make_card(container)
         ac.pack(fill="x", pady=(0, 12))
@@ -1220,6 +1623,8 @@ class App(ctk.CTk):
     def start_broadcast(self):
         if self.is_broadcasting:
             self.is_broadcasting = False
+            if self.engine:
+                self.engine.stop()
             self.start_btn.configure(text="▶  Start Broadcast",
                                      fg_color=WIN11["accent"],
                                      hover_color=WIN11["accent_hover"])
@@ -1231,96 +1636,113 @@ class App(ctk.CTk):
             self.log_message("Error: Message is empty.")
             return
 
-        target_ids = [gid for gid, var in self.group_vars.items() if var.get()]
+        target_ids = [g['id'] for g in self.groups
+                      if g['id'] in self.selected_groups and g['id'] not in self.pending_blacklist]
         if not target_ids:
             self.log_message("Error: No groups selected.")
             return
 
+        error = attachment_error(self.attachments, message)
+        if error:
+            self.log_message(f"Error: {error}")
+            return
+
         try:
             interval = int(self.interval_entry.get())
             duration = int(self.duration_entry.get())
+            parallel = int(self.parallel_entry.get())
         except ValueError:
-            self.log_message("Error: Invalid interval or duration.")
+            self.log_message("Error: Invalid interval, duration or parallel sends.")
             return
 
-        self.is_broadcasting = True
-        self.start_btn.configure(text="⏹  Stop Broadcast",
-                                  fg_color=WIN11["danger"],
-                                  hover_color=WIN11["danger_hover"])
-        self.log_message(f"Starting broadcast to {len(target_ids)} groups…")
-        threading.Thread(
-            target=self._broadcast_task,
-            args=(target_ids, message, interval, duration),
-            daemon=True,
-        ).start()
-
-    def _broadcast_task(self, target_ids, message, user_interval, duration_min):
-        start_time = time.time()
-        end_time   = start_time + (duration_min * 60)
-        is_unique  = self.unique_mode_var.get()
-        is_safe    = self.safe_mode_var.get()
-
-        effective_interval = max(user_interval, 60) if is_safe else user_interval
-        if is_safe:
-            self.log_message(f"Safe Mode ON: effective interval = {effective_interval}s")
-
-        while self.is_broadcasting and time.time() < end_time:
-            sent_in_this_loop = 0
+        if parallel != self.settings.get("max_parallel"):
+            self.settings["max_parallel"] = parallel
+            self.save_settings()
 
-            current_targets = [g for g in self.groups if g['id'] in target_ids]
-            current_targets.sort(key=lambda g: g.get('slowmode_until', 0))
-
-            for grp in current_targets:
-                if not self.is_broadcasting:
-                    break
+        effective_interval = max(interval, 60) if self.safe_mode_var.get() else interval
+        if self.safe_mode_var.get():
+            self.log_message(f"Safe Mode ON: effective interval = {effective_interval}s")
 
-                gid = grp['id']
-                now  = time.time()
-                last = self.group_last_sent.get(gid, 0)
+        wanted = set(target_ids)
+        targets = [g for g in self.groups if g['id'] in wanted]
+        job_id = self.jobs.create_job(message, effective_interval, duration, parallel,
+                                      self.unique_mode_var.get(), targets, self.attachments)
+        self._start_job(self.jobs.job(job_id), targets)
+
+    def _start_job(self, job, targets):
+        """Runs a stored job; used for new broadcasts and for resuming interrupted ones."""
+        shards = self.pool.shard(targets)
+        self.engine = BroadcastEngine(
+            shards, job['message'], job['interval'], (job['ends_at'] - time.time()) / 60,
+            concurrency=job['concurrency'], spintax=bool(job['spintax']), slowmode=self.slowmode,
+            spintax_variants=self.settings.get("spintax_variants", SPINTAX_VARIANTS),
+            spintax_window=self.settings.get("spintax_window", SPINTAX_REPEAT_WINDOW),
+            log_callback=self._safe_log,
+            progress_callback=lambda frac: self.ui_bus.post("progress", frac),
+            stats_callback=lambda stats: self.ui_bus.post("stats", stats),
+            store=self.jobs, job_id=job['id'], media=job['media'],
+        )
 
-                if (now - last) < effective_interval:
-                    continue
-                if grp.get('slowmode_until', 0) > 0:
-                    continue
+        if self.engine.variants:
+            pool = self.engine.variants
+            possible = pool.possible if pool.possible < 10 ** 9 else "10^9+"
+            self.log_message(f"SpinTax: {len(pool.variants)} unique variants ready "
+                             f"(of {possible} possible).")
 
-                try:
-                    msg_to_send = parse_spintax(message) if is_unique else message
-                    self.log_message(f"Sending → {grp['title']}…")
-                    future = self.manager.send_message(gid, msg_to_send)
-
-                    res_start = time.time()
-                    while not future.done() and time.time() - res_start < 10:
-                        time.sleep(0.1)
-
-                    if future.done():
-                        future.result()
-                        self.log_message(f"✓ Sent → {grp['title']}")
-                        self.group_last_sent[gid] = time.time()
-                        grp['slowmode_until'] = grp.get('slowmode', 0)
-                        sent_in_this_loop += 1
-                        self.progress_bar.set((target_ids.index(gid) + 1) / len(target_ids))
-                    else:
-                        self.log_message(f"Timeout → {grp['title']}")
-
-                except errors.SlowModeWaitError as e:
-                    self.log_message(f"SlowMode → {grp['title']}: wait {e.seconds}s")
-                    grp['slowmode_until'] = e.seconds
-                except Exception as e:
-                    self.log_message(f"Failed → {grp['title']}: {e}")
-
-                time.sleep(random.uniform(1, 3))
-
-            if sent_in_this_loop == 0:
-                remaining = int(end_time - time.time())
-                if remaining > 0:
-                    time.sleep(5)
+        self.is_broadcasting = True
+        for label in self.live_counters.values():
+            label.configure(text="0  /  0")
+        self.live_status.configure(text="Starting…")
+        self.live_panel.grid()
+        self.start_btn.configure(text="⏹  Stop Broadcast",
+                                  fg_color=WIN11["danger"],
+                                  hover_color=WIN11["danger_hover"])
+        self.log_message(f"Starting broadcast to {len(targets)} groups…")
+        if len(shards) > 1:
+            self.log_message("Sharded across accounts: " + ", ".join(
+                f"{m.session_name} ({len(g)})" for m, g in shards.items()))
+        engine = self.engine
+        self.ui_bus.watch(self.loop_thread.run_coroutine(self._broadcast_task(engine)),
+                          self._on_broadcast_finished, lambda e: self._on_broadcast_finished(engine))
+
+    def _offer_resume(self):
+        job = self.jobs.interrupted()
+        if job is None or self.is_broadcasting:
+            return
+        progress = self.jobs.progress(job['id'])
+        served = sum(1 for state in progress.values() if state['last_sent'])
+        minutes_left = max(1, int((job['ends_at'] - time.time()) // 60))
+
+        def _answer(resume):
+            if not resume:
+                self.jobs.finish(job['id'], "abandoned")
+            elif not self.is_broadcasting:
+                self.log_message(f"Resuming interrupted broadcast ({served}/{len(progress)} groups served).")
+                self._start_job(job, self.jobs.targets(job['id'], self.groups))
+
+        self.ask_yes_no("Resume Broadcast",
+                        f"A broadcast to {len(progress)} groups was interrupted "
+                        f"({served} already sent, {minutes_left} min left).\n\nResume it?",
+                        _answer)
+
+    async def _broadcast_task(self, engine: BroadcastEngine):
+        try:
+            await engine.run()
+        except Exception as e:
+            self._safe_log(f"Broadcast error: {e}")
+        return engine
 
+    def _on_broadcast_finished(self, engine):
         self.log_message("Broadcast session ended.")
+        if self.engine is not engine:
+            return
         self.is_broadcasting = False
+        self.engine = None
         self.start_btn.configure(text="▶  Start Broadcast",
                                   fg_color=WIN11["accent"],
                                   hover_color=WIN11["accent_hover"])
         self.progress_bar.set(0)
+        self.live_panel.grid_remove()
 
     # ─────────────────────────────────────────────────────────────────────────
     # Utilities
@@ -1328,29 +1750,41 @@ class App(ctk.CTk):
     def check_for_updates(self):
         def _check():
             try:
+                import requests
                 url = "https://api.github.com/repos/khan-zero/Broadcaster/releases/latest"
                 response = requests.get(url, timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     version = data.get("tag_name", "Unknown")
-                    self.log_message(f"Latest version: {version}")
-                    self.show_info("Update Check", f"Latest GitHub release: {version}")
+                    self._safe_log(f"Latest version: {version}")
+                    self.ui_bus.post("info", ("Update Check", f"Latest GitHub release: {version}"))
                 else:
-                    self.log_message("Update check failed: repo not found or private.")
+                    self._safe_log("Update check failed: repo not found or private.")
             except Exception as e:
-                self.log_message(f"Update check error: {e}")
-        threading.Thread(target=_check, daemon=True).start()
+                self._safe_log(f"Update check error: {e}")
+        self.ui_bus.watch(self.loop_thread.run_coroutine(asyncio.to_thread(_check)), lambda _: None)
 
     def report_bug(self):
+        import webbrowser
         webbrowser.open("https://github.com/khan-zero/Broadcaster/issues")
 
+    def add_account(self):
+        AccountLoginDialog(self, TelegramManager(self.loop_thread, self._safe_log),
+                           callback=self._on_account_added)
+
+    def _on_account_added(self, manager):
+        self.pool.add(manager)
+        self.log_message(f"Account {manager.session_name} added.")
+        self.accounts_lbl.configure(text=f"{len(self.pool.managers)} accounts signed in")
+        self.refresh_groups()
+
     def logout(self, force=False):
         def _exec_logout(confirmed):
             if not confirmed: return
             try:
                 if self.manager.client and self.manager.phone:
                     try:
-                        self.manager.loop_thread.run_coroutine(self.manager.client.disconnect())
+                        self.pool.disconnect_all()
                     except Exception:
                         pass
                     if not force:
@@ -1360,6 +1794,10 @@ class App(ctk.CTk):
                                 os.remove(session_file)
                             except Exception:
                                 pass
+                # execv skips atexit; a running job stays resumable after the restart.
+                self.jobs.close()
+                metrics.close()
+                storage.flush()
                 self.destroy()
                 os.execv(sys.executable, [sys.executable] + sys.argv)
             except Exception:
@@ -1370,53 +1808,24 @@ class App(ctk.CTk):
         else:
             self.ask_yes_no("Sign Out", "Are you sure you want to sign out?", _exec_logout)
 
+    # Reads come from memory and writes are debounced and atomic (see DocumentStore).
     def save_groups_local(self, groups):
-        try:
-            with open(GROUPS_FILE, "w") as f:
-                json.dump(groups, f)
-        except Exception as e:
-            self.log_message(f"Failed to save groups.json: {e}")
+        self.pool.save_groups(groups)
 
     def load_drafts(self):
-        if os.path.exists(DRAFTS_FILE):
-            try:
-                with open(DRAFTS_FILE, "r") as f:
-                    return json.load(f)
-            except Exception:
-                return []
-        return []
+        return storage.get(DRAFTS_FILE, [])
 
     def save_drafts_local(self):
-        try:
-            with open(DRAFTS_FILE, "w") as f:
-                json.dump(self.drafts, f)
-        except Exception as e:
-            self.log_message(f"Failed to save drafts: {e}")
+        storage.put(DRAFTS_FILE, self.drafts)
 
     def load_blacklist_local(self):
-        if os.path.exists(BLACKLIST_FILE):
-            try:
-                with open(BLACKLIST_FILE, "r") as f:
-                    return set(json.load(f))
-            except Exception:
-                return set()
-        return set()
+        return set(storage.get(BLACKLIST_FILE, []))
 
     def load_settings(self):
-        if os.path.exists(SETTINGS_FILE):
-            try:
-                with open(SETTINGS_FILE, "r") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+        return storage.get(SETTINGS_FILE, {})
 
     def save_settings(self):
-        try:
-            with open(SETTINGS_FILE, "w") as f:
-                json.dump(self.settings, f)
-        except Exception as e:
-            print(f"Failed to save settings: {e}")
+        storage.put(SETTINGS_FILE, self.settings)
 
     def _load_image_to_label(self, label, size):
         try:
@@ -1432,6 +1841,7 @@ class App(ctk.CTk):
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 if __name__ == "__main__":
+    setup_logging()
     app = None
     try:
         app = App()
@@ -0,0 +1,168 @@
+"""Offline stand-in for the part of TelegramClient that TelegramManager uses.
+
+    manager = TelegramManager(loop_thread, log, client_factory=MockTelegramClient.factory(groups=1000))
+
+Every mock account sees `groups` megagroups. Sends take a random latency and
+can fail the way Telegram does: SlowModeWaitError when a group's slowmode has
+not elapsed, FloodWaitError at `flood_rate`, and dropped requests (which never
+answer, so the caller's timeout fires) at `drop_rate`. Uploads are accepted and
+counted (`uploaded_parts`, `uploaded_media`) so media broadcasts can be checked
+to upload each file once. update_group() changes a group and pushes the
+UpdateChannel Telegram would send, to exercise incremental dialog sync, and
+fail_next() makes one request raise a given error.
+Requests the mock does not implement raise TypeError.
+"""
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from telethon import errors, utils
+from telethon.tl.functions.channels import GetFullChannelRequest
+from telethon.tl.functions.messages import UploadMediaRequest
+from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+from telethon.tl.types import (
+    Channel, Document, InputMediaUploadedPhoto, InputPeerChannel, MessageMediaDocument, MessageMediaPhoto,
+    Photo, UpdateChannel,
+)
+
+
+class MockTelegramClient:
+    def __init__(self, session, api_id=None, api_hash=None, loop=None, flood_sleep_threshold=0,
+                 groups=100, latency=(0.02, 0.08), slowmode_ratio=0.2, slowmode_seconds=(10, 60),
+                 warm_slowmode=True, flood_rate=0.0, flood_seconds=2, drop_rate=0.0,
+                 authorized=True, seed=None):
+        self.session = session
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.drop_rate = drop_rate
+        self.authorized = authorized
+        self.connected = False
+        self.sent = 0
+        self._rng = random.Random(seed)
+        self._msg_ids = itertools.count(1)
+        self._last_send = {}
+        self._handlers = []
+        self._failures = {}
+        self._media_ids = itertools.count(1)
+        self.uploaded_parts = 0
+        self.uploaded_media = 0
+
+        now = datetime.now(timezone.utc)
+        self._dialogs = []
+        self._entities = {}
+        self._slowmode = {}
+        for i in range(1, groups + 1):
+            slowmode = self._rng.randint(*slowmode_seconds) if self._rng.random() < slowmode_ratio else 0
+            peer = InputPeerChannel(channel_id=i, access_hash=i * 7919)
+            gid = utils.get_peer_id(peer)
+            self._slowmode[gid] = slowmode
+            if slowmode and warm_slowmode:
+                # As if a previous run had just posted here.
+                self._last_send[gid] = time.monotonic() - self._rng.uniform(0, slowmode * 2)
+            entity = Channel(id=i, title=f"Group {i}", photo=None, date=now, megagroup=True,
+                             restricted=False, left=False, access_hash=peer.access_hash)
+            entity.slowmode_seconds = slowmode
+            self._entities[gid] = entity
+            self._dialogs.append(SimpleNamespace(
+                id=gid, name=entity.title, entity=entity, input_entity=peer,
+                is_group=True, is_channel=True, pinned=False, date=now - timedelta(seconds=i)))
+
+    @classmethod
+    def factory(cls, **options):
+        """A TelegramManager client_factory building mocks with `options`."""
+        return lambda session, *args, **kwargs: cls(session, *args, **kwargs, **options)
+
+    # ── TelegramClient subset ─────────────────────────────────────────────────
+    async def connect(self):
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def is_user_authorized(self):
+        return self.authorized
+
+    def add_event_handler(self, callback, event=None):
+        self._handlers.append((callback, getattr(event, "types", None)))
+
+    async def iter_dialogs(self):
+        for dialog in self._dialogs:
+            yield dialog
+
+    async def get_entity(self, peer):
+        self._raise_failure("get_entity")
+        return self._entities[utils.get_peer_id(peer)]
+
+    async def __call__(self, request):
+        await asyncio.sleep(self._rng.uniform(*self.latency))
+        self._raise_failure(type(request))
+        if isinstance(request, (SaveFilePartRequest, SaveBigFilePartRequest)):
+            self.uploaded_parts += 1
+            return True
+        if isinstance(request, UploadMediaRequest):
+            self.uploaded_media += 1
+            media_id = next(self._media_ids)
+            if isinstance(request.media, InputMediaUploadedPhoto):
+                return MessageMediaPhoto(photo=Photo(
+                    id=media_id, access_hash=media_id * 31, file_reference=b"ref", date=None, sizes=[], dc_id=1))
+            return MessageMediaDocument(document=Document(
+                id=media_id, access_hash=media_id * 31, file_reference=b"ref", date=None,
+                mime_type=request.media.mime_type, size=0, dc_id=1, attributes=request.media.attributes))
+        if isinstance(request, GetFullChannelRequest):
+            gid = utils.get_peer_id(request.channel)
+            return SimpleNamespace(full_chat=SimpleNamespace(
+                id=self._entities[gid].id, slowmode_seconds=self._slowmode[gid] or None))
+        raise TypeError(f"MockTelegramClient does not support {type(request).__name__}")
+
+    async def send_file(self, entity, file, caption=None):
+        """Albums are a single request, so they cost one send like a plain message."""
+        message = await self.send_message(entity, caption, file=file)
+        return [message]
+
+    async def send_message(self, entity, message, file=None):
+        gid = utils.get_peer_id(entity)
+        if self._rng.random() < self.drop_rate:
+            await asyncio.Event().wait()  # never answered
+        await asyncio.sleep(self._rng.uniform(*self.latency))
+
+        if self._rng.random() < self.flood_rate:
+            raise errors.FloodWaitError(request=None, capture=self.flood_seconds)
+        now = time.monotonic()
+        slowmode = self._slowmode.get(gid, 0)
+        if slowmode and now - self._last_send.get(gid, float("-inf")) < slowmode:
+            remaining = slowmode - (now - self._last_send[gid])
+            raise errors.SlowModeWaitError(request=None, capture=max(1, round(remaining)))
+
+        self._last_send[gid] = now
+        self.sent += 1
+        return SimpleNamespace(id=next(self._msg_ids), peer_id=gid, message=message, media=file)
+
+    # ── Test controls ─────────────────────────────────────────────────────────
+    def fail_next(self, request, error):
+        """Makes the next `request` (a request class, or "get_entity") raise `error`."""
+        self._failures.setdefault(request, []).append(error)
+
+    def _raise_failure(self, request):
+        if self._failures.get(request):
+            raise self._failures[request].pop(0)
+
+    async def update_group(self, gid, **changes):
+        """Changes a group (`title`, `left`, `restricted`, `slowmode`) and delivers
+        the UpdateChannel to the registered event handlers."""
+        entity = self._entities[gid]
+        for key, value in changes.items():
+            if key == "slowmode":
+                self._slowmode[gid] = value
+                entity.slowmode_seconds = value
+            elif key in ("title", "left", "restricted"):
+                setattr(entity, key, value)
+            else:
+                raise TypeError(f"update_group() got an unexpected change {key!r}")
+        update = UpdateChannel(channel_id=entity.id)
+        for callback, types in self._handlers:
+            if types is None or isinstance(update, types):
+                await callback(update)
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import SpintaxTemplate  # noqa: E402
+
+
+class UnbalancedBracesTest(unittest.TestCase):
+    def test_stray_open_braces_are_text(self):
+        self.assertEqual(SpintaxTemplate("{" * 20 + "x").render(), "{" * 20 + "x")
+        self.assertEqual(SpintaxTemplate("{a|{b}").render(), "{a|b")
+
+    def test_stray_close_braces_are_text(self):
+        self.assertEqual(SpintaxTemplate("{a}}|").render(), "a}|")
+
+    def test_many_stray_braces_parse_in_linear_time(self):
+        start = time.perf_counter()
+        SpintaxTemplate("{" * 5000 + "x")
+        SpintaxTemplate("{a|" * 5000 + "x")
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+class DeepNestingTest(unittest.TestCase):
+    def test_deeply_nested_template(self):
+        depth = 5000
+        template = SpintaxTemplate("{a|" * depth + "z" + "}" * depth)
+        self.assertEqual(template.combinations(), depth + 1)
+        self.assertIn(template.render(), ("a", "z"))
+
+    def test_weights_survive_nesting(self):
+        template = SpintaxTemplate("{{x^0|y}^5|w^0}")
+        self.assertEqual(template.render(), "y")
+
+
+class EscapeTest(unittest.TestCase):
+    def test_backslash_escapes_syntax_characters(self):
+        self.assertEqual(SpintaxTemplate(r"\{a\|b\} 50\% \\").render(), "{a|b} 50% \\")
+
+    def test_other_backslashes_are_text(self):
+        self.assertEqual(SpintaxTemplate(r"C:\Users\new {a}").render(), r"C:\Users\new a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core  # noqa: E402
+from mock_telegram import MockTelegramClient  # noqa: E402
+from telethon import errors  # noqa: E402
+from telethon.tl.functions.channels import GetFullChannelRequest  # noqa: E402
+
+_cwd = os.getcwd()
+
+
+def setUpModule():
+    # The manager keeps its peer cache under sessions/ in the working directory.
+    os.chdir(tempfile.mkdtemp(prefix="sync-test-"))
+
+
+def tearDownModule():
+    core.storage.flush()
+    os.chdir(_cwd)
+
+
+class IncrementalSyncTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.loop_thread = core.AsyncLoopThread()
+        cls.loop_thread.start()
+
+    def setUp(self):
+        self.manager = core.TelegramManager(self.loop_thread, lambda msg: None,
+                                            client_factory=MockTelegramClient.factory(groups=10, seed=1))
+        self.manager.phone = self.id().rsplit(".", 1)[-1]
+        self.manager._create_client(self.manager.session_name)
+        self.client = self.manager.client
+        self.run_async(self.client.connect())
+        self.groups = self.run_async(self.manager._get_groups(full=True))
+        self.gid = self.groups[0]["id"]
+
+    def run_async(self, coro):
+        return self.loop_thread.run_coroutine(coro).result(timeout=10)
+
+    def sync(self):
+        return {g["id"]: g for g in self.run_async(self.manager._get_groups())}
+
+    def test_updated_group_is_refreshed(self):
+        self.run_async(self.client.update_group(self.gid, title="Renamed", slowmode=30))
+        groups = self.sync()
+        self.assertEqual(len(groups), 10)
+        self.assertEqual(groups[self.gid]["title"], "Renamed")
+        self.assertEqual(groups[self.gid]["slowmode"], 30)
+
+    def test_left_group_is_removed(self):
+        self.run_async(self.client.update_group(self.gid, left=True))
+        self.assertNotIn(self.gid, self.sync())
+        self.assertNotIn(self.gid, self.manager.peers)
+
+    def test_unreachable_group_is_removed(self):
+        self.client.fail_next(GetFullChannelRequest, errors.ChannelPrivateError(request=None))
+        self.run_async(self.client.update_group(self.gid, title="Renamed"))
+        self.assertNotIn(self.gid, self.sync())
+
+    def test_transient_error_keeps_group_until_next_sync(self):
+        self.client.fail_next(GetFullChannelRequest, errors.FloodWaitError(request=None, capture=600))
+        self.run_async(self.client.update_group(self.gid, title="Renamed", slowmode=30))
+        groups = self.sync()
+        self.assertEqual(len(groups), 10)
+        self.assertEqual(groups[self.gid]["title"], self.groups[0]["title"])
+        self.assertIn(self.gid, self.manager.peers)
+
+        groups = self.sync()
+        self.assertEqual(groups[self.gid]["title"], "Renamed")
+        self.assertEqual(groups[self.gid]["slowmode"], 30)
+
+
+if __name__ == "__main__":
+    unittest.main()